@@ -12,18 +12,50 @@ Dataset JSON shape expected:
   "input": {"0": 401, ...},
   "_source": "optional provenance"
 }
+
+A dataset may also be a packed ``.bin`` file (see ``DatasetBackend.save_packed``):
+the holding table followed by the input table, each 65536 little-endian
+uint16 values, which loads with a single read and no per-register parsing.
 """
 
 from __future__ import annotations
 import abc
 import json
+from array import array
 import asyncio
+import os
 import time
 import pathlib
-from typing import Dict, List, Iterable, Any
+import sys
+from typing import Dict, List, Iterable, Any, Tuple
 
 Number = int  # registers values are ints 0..65535 (unsigned representation)
 
+REGISTER_SPACE = 0x10000  # Modbus addresses are 16-bit
+
+_encode = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"), check_circular=False
+).encode
+
+
+def _dense_table(values: Dict[str, Any]) -> array:
+    """Expand a JSON ``{"addr": value}`` mapping into a uint16 array."""
+    table = array("H", bytes(2 * REGISTER_SPACE))
+    for k, v in values.items():
+        addr = int(k)
+        if 0 <= addr < REGISTER_SPACE:
+            table[addr] = int(v) & 0xFFFF
+    return table
+
+
+def _load_packed(path: pathlib.Path) -> Tuple[array, array]:
+    data = array("H")
+    with path.open("rb") as fh:
+        data.fromfile(fh, 2 * REGISTER_SPACE)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data[:REGISTER_SPACE], data[REGISTER_SPACE:]
+
 
 class Backend(abc.ABC):
     """Abstract backend definition."""
@@ -45,7 +77,8 @@ class Backend(abc.ABC):
 class DatasetBackend(Backend):
     """Static dataset implementation.
 
-    Missing addresses return 0. Dataset is stored in memory as two dicts.
+    Missing addresses return 0. Dataset is stored in memory as two dense
+    uint16 arrays spanning the whole address space, so a read is one slice.
     Optional mutators can be supplied to produce dynamic values.
     """
 
@@ -53,48 +86,57 @@ class DatasetBackend(Backend):
         self, dataset_path: str | pathlib.Path, *, mutate: bool = False
     ) -> None:
         p = pathlib.Path(dataset_path)
-        raw = json.loads(p.read_text(encoding="utf-8"))
-        self.holding: Dict[int, int] = {
-            int(k): int(v) for k, v in raw.get("holding", {}).items()
-        }
-        self.input: Dict[int, int] = {
-            int(k): int(v) for k, v in raw.get("input", {}).items()
-        }
+        if p.suffix == ".bin":
+            self.holding, self.input = _load_packed(p)
+        else:
+            raw = json.loads(p.read_text(encoding="utf-8"))
+            self.holding = _dense_table(raw.get("holding", {}))
+            self.input = _dense_table(raw.get("input", {}))
         self._mutate = mutate
         self._start = time.time()
 
-    def _maybe_mutate(self, table: Dict[int, int], addr: int, val: int) -> int:
-        if not self._mutate:
-            return val
-        # Simple deterministic mutator: increment energy-like counters slowly
-        # (heuristic: addresses > 100 and value non-negative)
-        elapsed = int(time.time() - self._start)
-        if addr > 100 and val >= 0:
-            return (val + elapsed) & 0xFFFF
-        return val
+    def save_packed(self, path: str | pathlib.Path) -> None:
+        """Write the current tables as a packed ``.bin`` dataset."""
+        data = self.holding + self.input
+        if sys.byteorder == "big":
+            data.byteswap()
+        with pathlib.Path(path).open("wb") as fh:
+            data.tofile(fh)
+
+    def _read(self, table: array, address: int, count: int) -> List[int]:
+        regs = table[address : address + count].tolist()
+        if len(regs) < count:
+            regs.extend([0] * (count - len(regs)))
+        if self._mutate:
+            # Simple deterministic mutator: increment energy-like counters slowly
+            # (heuristic: addresses > 100)
+            elapsed = int(time.time() - self._start)
+            first = max(0, 101 - address)
+            regs[first:] = [(v + elapsed) & 0xFFFF for v in regs[first:]]
+        return regs
 
     async def read_input(self, unit: int, address: int, count: int) -> List[int]:
-        return [
-            self._maybe_mutate(self.input, a, self.input.get(a, 0))
-            for a in range(address, address + count)
-        ]
+        return self._read(self.input, address, count)
 
     async def read_holding(self, unit: int, address: int, count: int) -> List[int]:
-        return [
-            self._maybe_mutate(self.holding, a, self.holding.get(a, 0))
-            for a in range(address, address + count)
-        ]
+        return self._read(self.holding, address, count)
 
     async def write_single(
         self, unit: int, address: int, value: int
     ) -> None:  # allow ephemeral overriding
-        self.holding[address] = value & 0xFFFF
+        # Like the dataset loader, drop addresses outside the 16-bit space
+        if 0 <= address < REGISTER_SPACE:
+            self.holding[address] = value & 0xFFFF
 
     async def write_multiple(
         self, unit: int, address: int, values: Iterable[int]
     ) -> None:
-        for offset, v in enumerate(values):
-            self.holding[address + offset] = int(v) & 0xFFFF
+        vals = array("H", (int(v) & 0xFFFF for v in values))
+        # Clip to the address space so the table never changes size
+        start = max(address, 0)
+        end = min(address + len(vals), REGISTER_SPACE)
+        if start < end:
+            self.holding[start:end] = vals[start - address : end - address]
 
 
 class CaptureBackend(Backend):
@@ -103,19 +145,44 @@ class CaptureBackend(Backend):
     Events:
       {"ts": <unix>, "op": "read_input",  "unit":1,"addr":0,"count":10,"regs":[...]}
       {"ts": <unix>, "op": "write_single","unit":1,"addr":45,"value":1234}
+
+    The file stays open for the backend's lifetime; each line is flushed to
+    the OS as it is written and fsync runs at most once per ``sync_interval``
+    seconds. Call ``aclose()`` when done to sync and release the handle.
     """
 
-    def __init__(self, inner: Backend, jsonl_path: str | pathlib.Path) -> None:
+    def __init__(
+        self,
+        inner: Backend,
+        jsonl_path: str | pathlib.Path,
+        *,
+        sync_interval: float = 0.1,
+    ) -> None:
         self._inner = inner
         self._path = pathlib.Path(jsonl_path)
         # Create file early so existence signals capture mode.
         self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self._path.open("a", encoding="utf-8")
         self._lock = asyncio.Lock()
+        self._sync_interval = sync_interval
+        self._last_sync = time.monotonic()
 
     async def _log(self, payload: Dict[str, Any]) -> None:
         async with self._lock:
-            with self._path.open("a", encoding="utf-8") as fh:
-                fh.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            self._fh.write(_encode(payload) + "\n")
+            self._fh.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= self._sync_interval:
+                self._last_sync = now
+                await asyncio.to_thread(os.fsync, self._fh.fileno())
+
+    async def aclose(self) -> None:
+        async with self._lock:
+            if self._fh.closed:
+                return
+            self._fh.flush()
+            await asyncio.to_thread(os.fsync, self._fh.fileno())
+            self._fh.close()
 
     async def read_input(self, unit: int, address: int, count: int) -> List[int]:
         regs = await self._inner.read_input(unit, address, count)
@@ -9,29 +9,153 @@ Growatt RTU Broker
 """
 
 from __future__ import annotations
-import argparse, socket, threading, time, json, datetime, os
-from typing import Iterable, Optional, List
+import argparse, signal, socket, sys, threading, time, json, os, queue
+import collections, select
+import asyncio, atexit, struct
+from typing import Callable, Deque, Dict, Iterable, Optional, List, Tuple
 import serial
 
+try:
+    import uvloop
+except ImportError:  # optional accelerator
+    uvloop = None
 
-def modbus_crc(data: bytes) -> int:
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
+
+def _build_crc_table() -> Iterable[int]:
+    for i in range(256):
+        crc = i
         for _ in range(8):
             crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
-    return crc & 0xFFFF
+        yield crc
+
+
+# Byte-at-a-time lookup table for CRC-16/MODBUS (poly 0xA001 reflected)
+_CRC_TABLE = tuple(_build_crc_table())
+
+# Two-bytes-at-a-time table: the CRC register is exactly 16 bits wide, so
+# after XOR-ing in a little-endian word the next state depends on that value
+# alone. Halves the interpreted iterations on long frames. At 65536 entries
+# (~2 MB) it is only built on first use, i.e. never when crcmod's C function
+# replaces the table code below.
+_CRC_TABLE16: Optional[Tuple[int, ...]] = None
+_WORDS_NATIVE = sys.byteorder == "little"
+
+
+def _crc_table16() -> Tuple[int, ...]:
+    global _CRC_TABLE16
+    if _CRC_TABLE16 is None:
+        t = _CRC_TABLE
+        _CRC_TABLE16 = tuple(
+            (t[x & 0xFF] >> 8) ^ t[((x >> 8) ^ t[x & 0xFF]) & 0xFF]
+            for x in range(0x10000)
+        )
+    return _CRC_TABLE16
+
+
+def _modbus_crc_table(data: bytes) -> int:
+    crc = 0xFFFF
+    t = _CRC_TABLE
+    n = len(data)
+    if n >= 16 and _WORDS_NATIVE:
+        t16 = _CRC_TABLE16 or _crc_table16()
+        with memoryview(data) as mv, mv[: n & ~1].cast("H") as words:
+            for w in words:
+                crc = t16[crc ^ w]
+        if n & 1:
+            crc = (crc >> 8) ^ t[(crc ^ data[n - 1]) & 0xFF]
+        return crc
+    for b in data:
+        crc = (crc >> 8) ^ t[(crc ^ b) & 0xFF]
+    return crc
+
+
+# Prefer crcmod's compiled extension when installed (pip install .[fast]);
+# its pure-Python fallback is no faster than the table above, so only the
+# C build is used.
+try:
+    from crcmod import _crcfunext  # noqa: F401
+    from crcmod.predefined import mkPredefinedCrcFun
+except ImportError:  # optional accelerator
+    modbus_crc = _modbus_crc_table
+else:
+    modbus_crc = mkPredefinedCrcFun("modbus")
+
+
+_U16LE = struct.Struct("<H")
+_U16BE_PAIR = struct.Struct(">HH")
 
 
 def add_crc(body: bytes) -> bytes:
-    c = modbus_crc(body)
-    return body + c.to_bytes(2, "little")
+    return body + _U16LE.pack(modbus_crc(body))
 
 
 def crc_ok(frame: bytes) -> bool:
-    if len(frame) < 4:
+    n = len(frame)
+    if n < 4:
         return False
-    return modbus_crc(frame[:-2]) == int.from_bytes(frame[-2:], "little")
+    return modbus_crc(frame[:-2]) == _U16LE.unpack_from(frame, n - 2)[0]
+
+
+# Largest frame the RTU spec allows (address + PDU + CRC)
+MAX_RTU_FRAME = 256
+
+
+def _expected_rtu_lens(buf, start: int) -> tuple[int, ...]:
+    """Return candidate frame lengths for an RTU frame starting at ``start``.
+
+    The framer cannot tell requests from responses, so function codes whose
+    request and response differ yield both lengths. An empty tuple means the
+    header is unknown (or too short to decide) and the caller must fall back
+    to a CRC search.
+    """
+    avail = len(buf) - start
+    if avail < 2:
+        return ()
+    func = buf[start + 1]
+    if func & 0x80:
+        # exception response: uid, func|0x80, code, crc
+        return (5,)
+    if func in (0x03, 0x04):
+        if avail < 3:
+            return (8,)
+        # response: uid, func, bytecount, data, crc; request: fixed 8 bytes
+        return (5 + buf[start + 2], 8)
+    if func == 0x06:
+        return (8,)
+    if func == 0x10:
+        if avail < 7:
+            return (8,)
+        # request: uid, func, addr, count, bytecount, data, crc; response: 8
+        return (9 + buf[start + 6], 8)
+    return ()
+
+
+def _expected_response_len(req: bytes) -> Optional[int]:
+    """Return the length of a normal reply to ``req``, or None if unknown."""
+    if len(req) < 8:
+        return None
+    func = req[1]
+    if func in (0x03, 0x04):
+        return 5 + 2 * ((req[4] << 8) | req[5])
+    if func in (0x06, 0x10):
+        return 8
+    return None
+
+
+def _scan_crc_boundary(buf, start: int, end: int) -> Optional[int]:
+    """Return the first ``stop`` such that ``buf[start:stop]`` passes the CRC.
+
+    Single pass with a running CRC, instead of re-hashing every prefix.
+    Only ``buf[start:end]`` is considered.
+    """
+    crc = 0xFFFF
+    t = _CRC_TABLE
+    for i in range(start, end - 2):
+        crc = (crc >> 8) ^ t[(crc ^ buf[i]) & 0xFF]
+        # minimal frame: 2 body bytes + 2 CRC bytes
+        if i > start and crc == buf[i + 1] | (buf[i + 2] << 8):
+            return i + 3
+    return None
 
 
 class RTUFramer:
@@ -42,71 +166,176 @@ class RTUFramer:
         # Use 3.5 char times but never below a safe floor to avoid premature frame cuts.
         gap_floor = 0.002  # 2 ms floor
         self.gap = max(gap_chars * char_time, gap_floor)
-        self.buf = bytearray()
+        # Block in the driver for at most one inter-frame gap: an empty read
+        # then means the line has been idle long enough to close the frame.
+        self.ser.timeout = self.gap
+        # Preallocated receive buffer reused across frames; live bytes are
+        # buf[_off:_end]. It only grows if a backlog outruns its capacity.
+        self.buf = bytearray(2 * MAX_RTU_FRAME)
+        self._off = 0
+        self._end = 0
+        # _end at the last fruitless scan; the buffer only grows between
+        # consumes, so an unchanged end means nothing new to scan.
+        self._miss_len = -1
         self.last = time.perf_counter()
 
+    def pending(self) -> int:
+        return self._end - self._off
+
+    def reset(self) -> None:
+        self._off = self._end = 0
+        self._miss_len = -1
+        self.last = time.perf_counter()
+
+    def _append(self, chunk: bytes) -> None:
+        n = len(chunk)
+        if self._end + n > len(self.buf):
+            live = self._end - self._off
+            if self._off:
+                # Slide the unconsumed tail to the front
+                self.buf[:live] = self.buf[self._off : self._end]
+                self._off, self._end = 0, live
+                self._miss_len = -1
+            if live + n > len(self.buf):
+                self.buf.extend(bytes(max(live + n - len(self.buf), len(self.buf))))
+        self.buf[self._end : self._end + n] = chunk
+        self._end += n
+        self.last = time.perf_counter()
+
+    def _consume(self, end_idx: int) -> None:
+        self._off = end_idx
+        self._miss_len = -1
+        if self._off >= self._end:
+            self._off = self._end = 0
+
+    def _find_frame(self) -> Optional[bytes]:
+        """Extract the first CRC-valid frame from the buffer, if any.
+
+        Searches every start offset (handles mis-alignment if we started
+        reading mid-frame) and returns the first valid frame, dropping any
+        prefix garbage and leaving the remainder buffered for the next call.
+        For known function codes the header gives the frame length, so each
+        start offset costs at most two CRC checks.
+        """
+        n = self._end
+        if n - self._off < 4 or n == self._miss_len:
+            return None
+        with memoryview(self.buf)[:n] as mv:
+            for start_idx in range(self._off, n - 3):
+                lens = _expected_rtu_lens(mv, start_idx)
+                if lens:
+                    ends = [start_idx + ln for ln in lens if start_idx + ln <= n]
+                else:
+                    # Unknown function code: search for a CRC boundary
+                    end_idx = _scan_crc_boundary(mv, start_idx, n)
+                    ends = [end_idx] if end_idx is not None else []
+                for end_idx in ends:
+                    if crc_ok(mv[start_idx:end_idx]):
+                        frame = bytes(mv[start_idx:end_idx])
+                        break
+                else:
+                    continue
+                break
+            else:
+                self._miss_len = n
+                return None
+        self._consume(end_idx)
+        return frame
+
+    def read_expected(self, length: int, timeout: float = 3.0) -> bytes:
+        """Read a frame whose length is known up front.
+
+        Used for replies to our own requests: returns as soon as ``length``
+        bytes (or a 5-byte exception reply) have arrived and pass the CRC
+        check, without waiting for the inter-frame gap. Anything unexpected
+        falls back to gap-based framing for the remaining time.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            have = self.pending()
+            if have >= 2 and self.buf[self._off + 1] & 0x80:
+                length = 5
+            if have >= length:
+                end = self._off + length
+                with memoryview(self.buf) as mv:
+                    frame = mv[self._off : end]
+                    frame = bytes(frame) if crc_ok(frame) else None
+                if frame is not None:
+                    self._consume(end)
+                    return frame
+                break
+            if time.perf_counter() >= deadline:
+                break
+            chunk = self.ser.read(length - have)
+            if chunk:
+                self._append(chunk)
+        return self.read_frame(timeout=max(0.0, deadline - time.perf_counter()))
+
     def read_frame(self, timeout: float = 3.0) -> bytes:
         start = time.perf_counter()
         while True:
-            n = self.ser.in_waiting
+            want = max(self.ser.in_waiting, MAX_RTU_FRAME)
+            chunk = self.ser.read(want)
             now = time.perf_counter()
-            if n:
-                self.buf.extend(self.ser.read(n))
-                self.last = now
+            if chunk:
+                # A short read only means the read timeout ran out (pyserial
+                # on POSIX ignores inter_byte_timeout here), not that the
+                # burst ended; wait for an empty read to see the line idle.
+                self._append(chunk)
             else:
-                if self.buf and (now - self.last) >= self.gap:
+                if self.pending() and (now - self.last) >= self.gap:
                     # Attempt to find a CRC-terminated frame inside the buffer.
                     # This handles combined frames (frame1+frame2) by returning
                     # the first valid frame and leaving the remainder in the buffer.
-                    if len(self.buf) >= 4:
-                        # Search for a valid frame anywhere in the buffer (handles
-                        # possible mis-alignment if we started reading mid-frame).
-                        buf = bytes(self.buf)
-                        for start_idx in range(0, len(buf) - 3):
-                            # minimal frame length is 4 bytes
-                            for end_idx in range(start_idx + 4, len(buf) + 1):
-                                if crc_ok(buf[start_idx:end_idx]):
-                                    # Extract the first valid frame
-                                    frame = buf[start_idx:end_idx]
-                                    # Remove consumed bytes (including any prefix garbage)
-                                    remaining = buf[end_idx:]
-                                    self.buf.clear()
-                                    if remaining:
-                                        self.buf.extend(remaining)
-                                    return frame
-                        # No valid CRC-terminated frame found; fallthrough to
-                        # timeout handling below (do not return partial data yet)
-                    else:
-                        # Buffer too small to contain a full frame, fallthrough
-                        pass
+                    frame = self._find_frame()
+                    if frame is not None:
+                        return frame
+                    # No valid CRC-terminated frame found; fallthrough to
+                    # timeout handling below (do not return partial data yet)
                 if (now - start) > timeout:
                     # On timeout: if we have a CRC-terminated frame in the buffer,
-                    # return it. Otherwise, do not return a partial frame (return
-                    # empty to indicate timeout) — this prevents higher layers from
-                    # processing incomplete frames which would fail CRC checks.
-                    if len(self.buf) >= 4:
-                        buf = bytes(self.buf)
-                        for start_idx in range(0, len(buf) - 3):
-                            for end_idx in range(start_idx + 4, len(buf) + 1):
-                                if crc_ok(buf[start_idx:end_idx]):
-                                    frame = buf[start_idx:end_idx]
-                                    remaining = buf[end_idx:]
-                                    self.buf.clear()
-                                    if remaining:
-                                        self.buf.extend(remaining)
-                                    return frame
+                    # return it; the rescan is free when the gap scan above has
+                    # already seen every buffered byte. Otherwise, do not return a
+                    # partial frame (return empty to indicate timeout) — this
+                    # prevents higher layers from processing incomplete frames
+                    # which would fail CRC checks.
+                    frame = self._find_frame()
+                    if frame is not None:
+                        return frame
                     # Protect against runaway buffer growth: if buffer gets very
                     # large and no valid frame is detected, drop it and return
                     # timeout to avoid memory issues.
-                    if len(self.buf) > 8192:
-                        self.buf.clear()
+                    if self.pending() > 8192:
+                        self.reset()
                     return b""
-                # Don’t try to sleep sub-millisecond; use a small fixed sleep to reduce CPU
-                time.sleep(max(0.001, self.char_time * 0.5))
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop, preferring uvloop when it is installed."""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+_iso_second: tuple[int, str] = (-1, "")
 
 
 def now_iso() -> str:
-    return datetime.datetime.now().isoformat(timespec="milliseconds")
+    """Local time as ``YYYY-mm-ddTHH:MM:SS.mmm``.
+
+    Events arrive in bursts within the same second, so the date/time prefix
+    is formatted once per second and only the milliseconds per call. The
+    cache is a single tuple so concurrent threads never see a torn pair.
+    """
+    global _iso_second
+    ns = time.time_ns()
+    sec = ns // 1_000_000_000
+    cached = _iso_second
+    if cached[0] != sec:
+        t = time.localtime(sec)
+        prefix = "%04d-%02d-%02dT%02d:%02d:%02d" % t[:6]
+        cached = _iso_second = (sec, prefix)
+    return "%s.%03d" % (cached[1], ns // 1_000_000 % 1000)
 
 
 def parse_host_port(spec: str) -> tuple[str, int]:
@@ -125,47 +354,94 @@ def parse_rtu(frame: bytes) -> dict:
     if len(frame) < 4:
         return {}
     uid, func = frame[0], frame[1]
-    body = frame[2:-2]
-    info = {"uid": uid, "func": func, "len": len(body)}
-    if func in (0x03, 0x04) and len(body) >= 4:
-        info["addr"] = (body[0] << 8) | body[1]
-        info["count"] = (body[2] << 8) | body[3]
-    elif func == 0x06 and len(body) >= 4:
-        info["addr"] = (body[0] << 8) | body[1]
-        info["value"] = (body[2] << 8) | body[3]
-    elif func == 0x10 and len(body) >= 5:
-        info["addr"] = (body[0] << 8) | body[1]
-        info["count"] = (body[2] << 8) | body[3]
-        info["bytes"] = body[4]
+    body_len = len(frame) - 4
+    info = {"uid": uid, "func": func, "len": body_len}
+    if func in (0x03, 0x04) and body_len >= 4:
+        info["addr"], info["count"] = _U16BE_PAIR.unpack_from(frame, 2)
+    elif func == 0x06 and body_len >= 4:
+        info["addr"], info["value"] = _U16BE_PAIR.unpack_from(frame, 2)
+    elif func == 0x10 and body_len >= 5:
+        info["addr"], info["count"] = _U16BE_PAIR.unpack_from(frame, 2)
+        info["bytes"] = frame[6]
     return info
 
 
 class EventSink:
-    def handle(self, event: dict) -> None:
+    """Consumer of broker events.
+
+    The same event dict is shared by every sink, so ``handle`` must treat it
+    as read-only. ``line`` is the event already encoded as compact JSON by
+    the hub; sinks that serialise the event should reuse it when given.
+    Sinks that can encode off the calling thread set ``needs_line`` to False;
+    the hub skips encoding when no sink needs it.
+    """
+
+    needs_line = True
+
+    def handle(self, event: dict, line: Optional[str] = None) -> None:
         raise NotImplementedError
 
 
+# One shared encoder for every event line: json.dumps() builds a new
+# JSONEncoder per call whenever options are passed. Events are flat dicts,
+# so the circular-reference check is skipped.
+encode_event = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"), check_circular=False
+).encode
+
+
 class EventHub:
     def __init__(self, sinks: Iterable[EventSink] | None = None):
         self.sinks: List[EventSink] = list(sinks or [])
 
+    def __bool__(self) -> bool:
+        # Lets callers write ``if self.events:`` to skip building events
+        # (hex strings, parsed headers) nobody will consume.
+        return bool(self.sinks)
+
     def emit(self, **event) -> None:
-        if not self.sinks:
+        sinks = self.sinks
+        if not sinks:
             return
-        payload = dict(event)
-        payload.setdefault("ts", now_iso())
-        for sink in list(self.sinks):
+        # **event is already a fresh dict owned by this call
+        event.setdefault("ts", now_iso())
+        line = None
+        for sink in sinks:
+            if sink.needs_line:
+                line = encode_event(event)
+                break
+        for sink in sinks:
             try:
-                sink.handle(dict(payload))
+                sink.handle(event, line)
             except Exception:
                 # Individual sink failures must not affect the broker loop
                 pass
 
 
 class WireLogger(EventSink):
-    def __init__(self, path: str | None):
+    """JSONL sink writing to a file, the console, or nowhere.
+
+    In file mode ``handle`` only enqueues the event; a dedicated writer
+    thread encodes it (unless the hub already did) and appends whatever has
+    accumulated with a single write, so neither JSON encoding nor a slow
+    disk stalls the thread that emitted the event. The queue is bounded:
+    when the writer falls behind, new events are dropped and counted in
+    ``dropped``, and the writer logs how many were lost once it catches up.
+    """
+
+    MAX_BATCH = 256
+    MAX_QUEUE = 10000
+
+    def __init__(self, path: str | None, *, sync_interval: float = 1.0):
         self.path = path
+        self.sync_interval = sync_interval
         self._lock = threading.Lock()
+        self._fh = None
+        self._last_sync = time.monotonic()
+        self._q: queue.Queue = queue.Queue(maxsize=self.MAX_QUEUE)
+        self._writer: Optional[threading.Thread] = None
+        self.dropped = 0
+        self._dropped_logged = 0
         # Determine logging mode: 'file', 'console', or 'disabled'
         if path is None or path == "" or path == "-":
             self._mode = "console"
@@ -176,40 +452,142 @@ class WireLogger(EventSink):
             try:
                 d = os.path.dirname(self.path) or "."
                 os.makedirs(d, exist_ok=True)
-                with open(self.path, "a", encoding="utf-8"):
-                    pass
+                self._fh = open(self.path, "a", encoding="utf-8")
             except Exception:
                 # Fall back to console if file cannot be prepared
                 self._mode = "console"
+            else:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="wire-log", daemon=True
+                )
+                self._writer.start()
+                # Daemon threads die with the interpreter; drain the queue
+                # and close the handle on a normal exit or Ctrl-C.
+                atexit.register(self.close)
+
+    @property
+    def needs_line(self) -> bool:
+        return self._mode != "file"
 
     def enabled(self) -> bool:
         return self._mode != "disabled"
 
-    def handle(self, event: dict) -> None:
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._q.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            data = "".join(
+                item if type(item) is str else encode_event(item) + "\n"
+                for item in batch
+                if item is not None
+            )
+            dropped = self.dropped
+            if dropped != self._dropped_logged:
+                data += encode_event(
+                    {
+                        "ts": now_iso(),
+                        "role": "WARN",
+                        "event": "log_dropped",
+                        "count": dropped - self._dropped_logged,
+                    }
+                )
+                data += "\n"
+                self._dropped_logged = dropped
+            if data:
+                self._write(data)
+            for _ in batch:
+                self._q.task_done()
+            if stop:
+                return
+
+    def _write(self, data: str) -> None:
+        try:
+            self._fh.write(data)
+            self._fh.flush()
+            self._maybe_sync()
+        except Exception:
+            # As a last resort, try console
+            try:
+                print(data, end="", flush=True)
+            except Exception:
+                pass
+
+    def _maybe_sync(self) -> None:
+        # Runs on the writer thread after each batch. Lines reach the OS
+        # immediately; fsync and the rotation check run at most once per
+        # sync_interval.
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        os.fsync(self._fh.fileno())
+        # Reopen if the log was rotated or removed underneath us
+        try:
+            st = os.stat(self.path)
+            cur = os.fstat(self._fh.fileno())
+            rotated = (st.st_dev, st.st_ino) != (cur.st_dev, cur.st_ino)
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self._fh.close()
+            self._fh = open(self.path, "a", encoding="utf-8")
+
+    def handle(self, event: dict, line: Optional[str] = None) -> None:
         if not self.enabled():
             return
-        line = json.dumps(event, ensure_ascii=False)
-        if self._mode == "console":
-            with self._lock:
-                try:
-                    print(line, flush=True)
-                except Exception:
-                    pass
+        if self._mode == "file":
+            try:
+                self._q.put_nowait(event if line is None else line + "\n")
+            except queue.Full:
+                self.dropped += 1
             return
-        # file mode
+        if line is None:
+            line = encode_event(event)
         with self._lock:
             try:
-                with open(self.path, "a", encoding="utf-8") as f:
-                    f.write(line + "\n")
+                print(line, flush=True)
             except Exception:
-                # As a last resort, try console
-                try:
-                    print(line, flush=True)
-                except Exception:
-                    pass
+                pass
+
+    def flush(self) -> None:
+        """Block until every queued line has been written."""
+        if self._writer is not None:
+            self._q.join()
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        atexit.unregister(self.close)
+        self._q.put(None)
+        self._writer.join()
+        self._writer = None
+        self._mode = "disabled"
+        try:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+        except Exception:
+            pass
+        self._fh = None
 
 
 class SnifferRelay(EventSink, threading.Thread):
+    """Stream JSONL events to any number of TCP subscribers.
+
+    ``handle`` only appends the encoded line to each subscriber's queue; a
+    sender thread pushes queued bytes out over non-blocking sockets, so a
+    slow or stuck subscriber cannot stall the broker. Subscribers that fall
+    more than MAX_PENDING bytes behind are disconnected.
+    """
+
+    MAX_PENDING = 1 << 20
+    SEND_CHUNK = 1 << 16
+
     def __init__(self, host: str, port: int):
         threading.Thread.__init__(self, daemon=True)
         self.addr = (host, port)
@@ -217,38 +595,238 @@ class SnifferRelay(EventSink, threading.Thread):
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.sock.bind(self.addr)
         self.sock.listen(5)
-        self._clients: List[socket.socket] = []
+        self._outq: Dict[socket.socket, Deque[bytes]] = {}
+        self._pending: Dict[socket.socket, int] = {}
         self._lock = threading.Lock()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
 
     def run(self):
+        self._sender.start()
         while True:
             try:
                 conn, _ = self.sock.accept()
             except OSError:
                 break
-            conn.setblocking(True)
+            conn.setblocking(False)
             with self._lock:
-                self._clients.append(conn)
+                self._outq[conn] = collections.deque()
+                self._pending[conn] = 0
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            # Wake-up already pending (socket buffer full) or shutting down
+            pass
 
-    def handle(self, event: dict) -> None:
-        line = json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n"
-        dead: List[socket.socket] = []
+    def _drop(self, conn: socket.socket) -> None:
+        # Called with the lock held
+        self._outq.pop(conn, None)
+        self._pending.pop(conn, None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @property
+    def needs_line(self) -> bool:
+        return bool(self._outq)
+
+    def handle(self, event: dict, line: Optional[str] = None) -> None:
+        if not self._outq:
+            # No subscribers: skip encoding (a racing accept just misses this event)
+            return
+        if line is None:
+            line = encode_event(event)
+        data = line.encode("utf-8") + b"\n"
         with self._lock:
-            clients = list(self._clients)
-        for conn in clients:
-            try:
-                conn.sendall(line)
-            except Exception:
-                dead.append(conn)
-        if dead:
+            for conn in list(self._outq):
+                self._outq[conn].append(data)
+                self._pending[conn] += len(data)
+                if self._pending[conn] > self.MAX_PENDING:
+                    self._drop(conn)
+        self._wake()
+
+    def _send_loop(self) -> None:
+        while True:
             with self._lock:
-                for conn in dead:
-                    if conn in self._clients:
-                        self._clients.remove(conn)
-                    try:
-                        conn.close()
-                    except Exception:
+                waiting = [conn for conn, q in self._outq.items() if q]
+            try:
+                readable, writable, _ = select.select([self._wake_r], waiting, [])
+            except (OSError, ValueError):
+                # A subscriber was closed while we were waiting; retry
+                continue
+            if readable:
+                try:
+                    while self._wake_r.recv(4096):
                         pass
+                except BlockingIOError:
+                    pass
+            with self._lock:
+                for conn in writable:
+                    q = self._outq.get(conn)
+                    if q:
+                        self._flush_one(conn, q)
+
+    def _flush_one(self, conn: socket.socket, q: Deque[bytes]) -> None:
+        # Called with the lock held; conn is non-blocking so send never waits
+        parts: List[bytes] = []
+        size = 0
+        for item in q:
+            parts.append(item)
+            size += len(item)
+            if size >= self.SEND_CHUNK:
+                break
+        try:
+            sent = conn.send(b"".join(parts))
+        except BlockingIOError:
+            return
+        except OSError:
+            self._drop(conn)
+            return
+        self._pending[conn] -= sent
+        while sent:
+            head = q[0]
+            if len(head) <= sent:
+                q.popleft()
+                sent -= len(head)
+            else:
+                q[0] = head[sent:]
+                sent = 0
+
+
+_PARITY_MAP = {
+    "N": serial.PARITY_NONE,
+    "E": serial.PARITY_EVEN,
+    "O": serial.PARITY_ODD,
+}
+_STOPBIT_MAP = {1: serial.STOPBITS_ONE, 2: serial.STOPBITS_TWO}
+
+
+def _parse_fmt(fmt: str) -> tuple[int, str, float, int]:
+    """Split a format like ``8E1`` into pyserial settings.
+
+    Returns ``(bytesize, parity, stopbits, bits_per_char)``, where the
+    character length counts the start bit for inter-frame gap timing.
+    """
+    databits = int(fmt[0])
+    parity = fmt[1].upper()
+    stop = int(fmt[2])
+    bits_per_char = 1 + databits + stop + (0 if parity == "N" else 1)
+    return databits, _PARITY_MAP[parity], _STOPBIT_MAP[stop], bits_per_char
+
+
+def set_low_latency(ser) -> bool:
+    """Best-effort ASYNC_LOW_LATENCY on a serial port (Linux only).
+
+    USB adapters such as FTDI hold received bytes for their latency timer
+    (16 ms by default) before handing them to the host; the flag drops that
+    to 1 ms. Returns False where unsupported (other platforms, ptys, most
+    native UARTs, which don't need it).
+    """
+    enable = getattr(ser, "set_low_latency_mode", None)
+    if enable is None:
+        return False
+    try:
+        enable(True)
+    except (ValueError, OSError):
+        return False
+    return True
+
+
+# Most registers a single 0x03/0x04 request may ask for
+MAX_READ_REGS = 125
+
+
+def _read_range(req: bytes) -> Optional[tuple[int, int, int, int]]:
+    """``(uid, func, addr, count)`` of a plain 0x03/0x04 request, else None."""
+    if len(req) != 8 or req[1] not in (0x03, 0x04):
+        return None
+    addr, count = _U16BE_PAIR.unpack_from(req, 2)
+    if not 1 <= count <= MAX_READ_REGS:
+        return None
+    return req[0], req[1], addr, count
+
+
+def _coalesce_reads(jobs: List["_Job"]) -> List[List["_Job"]]:
+    """Group queued jobs into runs that one downstream request can serve.
+
+    Register reads for the same unit and function whose ranges overlap or
+    adjoin are grouped while the merged span stays within MAX_READ_REGS;
+    every other job forms a group of its own and acts as a barrier: reads
+    are never merged across it, so a read queued after a write sees the
+    written value. Between barriers, groups are returned in the order their
+    earliest job was queued.
+    """
+    groups: List[List[_Job]] = []
+    reads: Dict[tuple[int, int], list] = {}
+    for i, job in enumerate(jobs):
+        rng = _read_range(job.req)
+        if rng is None:
+            groups.extend(_merge_read_ranges(reads))
+            reads = {}
+            groups.append([job])
+        else:
+            uid, func, addr, count = rng
+            reads.setdefault((uid, func), []).append((addr, addr + count, i, job))
+    groups.extend(_merge_read_ranges(reads))
+    return groups
+
+
+def _merge_read_ranges(reads: Dict[tuple[int, int], list]) -> List[List["_Job"]]:
+    """Merge one barrier-free run of reads, keyed by (unit, func)."""
+    groups: List[tuple[int, List[_Job]]] = []
+    for items in reads.values():
+        items.sort(key=lambda item: item[:3])
+        start = end = first = 0
+        members: List[_Job] = []
+        for addr, stop, i, job in items:
+            if members and addr <= end and max(end, stop) - start <= MAX_READ_REGS:
+                end = max(end, stop)
+                first = min(first, i)
+                members.append(job)
+            else:
+                if members:
+                    groups.append((first, members))
+                start, end, first, members = addr, stop, i, [job]
+        groups.append((first, members))
+    groups.sort(key=lambda group: group[0])
+    return [members for _, members in groups]
+
+
+class _Job:
+    """One queued downstream transaction and its eventual outcome."""
+
+    __slots__ = ("req", "client", "req_crc_ok", "done", "result", "error", "on_done")
+
+    def __init__(
+        self,
+        req: bytes,
+        client: str,
+        req_crc_ok: Optional[bool],
+        on_done: Optional[Callable[["_Job"], None]] = None,
+    ):
+        self.req = req
+        self.client = client
+        self.req_crc_ok = req_crc_ok
+        self.done = threading.Event()
+        self.result = b""
+        self.error: Optional[Exception] = None
+        # Called on the worker thread once the job has finished
+        self.on_done = on_done
+
+
+def _settle(fut: asyncio.Future, job: _Job) -> None:
+    # Runs on the future's loop; the awaiting client may have gone away
+    if fut.cancelled():
+        return
+    if job.error is not None:
+        fut.set_exception(job.error)
+    else:
+        fut.set_result(job.result)
 
 
 class Downstream:
@@ -260,83 +838,254 @@ class Downstream:
         *,
         min_cmd_period: float = 1.0,
         rtimeout: float = 1.5,
+        coalesce_window: Optional[float] = None,
+        read_cache_ttl: float = 0.0,
         events: Optional[EventHub] = None,
     ):
-        databits = int(fmt[0])
-        parity = fmt[1].upper()
-        stop = int(fmt[2])
-        py_par = {
-            "N": serial.PARITY_NONE,
-            "E": serial.PARITY_EVEN,
-            "O": serial.PARITY_ODD,
-        }[parity]
-        py_stp = {1: serial.STOPBITS_ONE, 2: serial.STOPBITS_TWO}[stop]
+        databits, py_par, py_stp, bits_per_char = _parse_fmt(fmt)
         self.ser = serial.Serial(
             dev, baud, bytesize=databits, parity=py_par, stopbits=py_stp, timeout=0
         )
-        bits_per_char = 1 + databits + stop + (0 if parity == "N" else 1)
         self.char_time = bits_per_char / baud
+        self.low_latency = set_low_latency(self.ser)
         self.framer = RTUFramer(self.ser, self.char_time)
-        self.lock = threading.Lock()
+        # All serial I/O happens on one worker thread fed in FIFO order, so
+        # the bus stays single-master and callers are served first come,
+        # first served.
+        self._jobs: "queue.SimpleQueue[Optional[_Job]]" = queue.SimpleQueue()
+        self._worker = threading.Thread(
+            target=self._work, name="downstream", daemon=True
+        )
         self.min_cmd_period = float(min_cmd_period)
         self.rtimeout = float(rtimeout)
-        self._last_done = 0.0
+        # None disables read coalescing; 0 merges only requests already
+        # queued once min_cmd_period has elapsed; >0 also waits that long.
+        self.coalesce_window = coalesce_window
+        # Replies to 0x03/0x04 reads keyed by uid+func+addr+count, each with
+        # its expiry time. Any other function code clears the cache, since it
+        # may have changed register values.
+        self.read_cache_ttl = float(read_cache_ttl)
+        self._cache: Dict[bytes, tuple[float, bytes]] = {}
+        # perf_counter() time before which the next request may not be sent
+        self._next_allowed = 0.0
         self.events = events
+        self._worker.start()
 
-    def _enforce_spacing(self):
-        now = time.perf_counter()
-        wait = self.min_cmd_period - (now - self._last_done)
-        if wait > 0:
-            time.sleep(wait)
-
-    def transact(self, req: bytes, *, client: str = "UNKNOWN") -> bytes:
-        with self.lock:
+    def _work(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            jobs = [job]
+            if self.coalesce_window is None:
+                self._run(job)
+                continue
+            # Requests that arrive while the bus is resting can share one
+            # downstream transaction.
             self._enforce_spacing()
-            # Drain OS input buffer and clear any accumulated bytes in the
-            # framer's internal buffer. If we don't clear the framer buffer
-            # a previously received unsolicited frame can be returned as the
-            # response to this new request, causing mis-attribution and
-            # CRC/timeout confusion.
-            _ = self.ser.read(self.ser.in_waiting or 0)
+            deadline = time.perf_counter() + self.coalesce_window
+            while True:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        job = self._jobs.get(timeout=remaining)
+                    else:
+                        job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    # Serve this batch first; stop on the next pass
+                    self._jobs.put(None)
+                    break
+                jobs.append(job)
+            for group in _coalesce_reads(jobs):
+                if len(group) == 1:
+                    self._run(group[0])
+                else:
+                    self._run_merged(group)
+
+    def close(self) -> None:
+        """Finish already queued transactions, then release the serial port."""
+        self._jobs.put(None)
+        self._worker.join(timeout=self.min_cmd_period + self.rtimeout + 1.0)
+        try:
+            self.ser.close()
+        except Exception:
+            pass
+
+    def _run(self, job: _Job) -> None:
+        try:
+            job.result = self._transact(job.req, job.client, job.req_crc_ok)
+        except Exception as exc:
+            job.error = exc
+        self._finish(job)
+
+    def _run_merged(self, group: List[_Job]) -> None:
+        """Serve several register reads with one request and split the reply."""
+        uid, func = group[0].req[0], group[0].req[1]
+        ranges = [_U16BE_PAIR.unpack_from(job.req, 2) for job in group]
+        start = min(addr for addr, _ in ranges)
+        count = max(addr + n for addr, n in ranges) - start
+        req = add_crc(bytes((uid, func)) + _U16BE_PAIR.pack(start, count))
+        clients = ",".join(dict.fromkeys(job.client for job in group))
+        try:
+            resp = self._transact(req, clients, True)
+        except Exception:
+            resp = b""
+        if len(resp) != 5 + 2 * count or resp[0] != uid or resp[1] != func:
+            # Exception reply or timeout: the device may not accept the
+            # merged range, so let each request get its own answer.
+            for job in group:
+                self._run(job)
+            return
+        for job, (addr, n) in zip(group, ranges):
+            off = 3 + 2 * (addr - start)
+            job.result = add_crc(bytes((uid, func, 2 * n)) + resp[off : off + 2 * n])
+            self._finish(job)
+
+    def _cached(self, req: bytes, client: str) -> Optional[bytes]:
+        if not self._cache or len(req) != 8:
+            return None
+        hit = self._cache.get(bytes(req[:6]))
+        if hit is None or hit[0] < time.monotonic():
+            return None
+        resp = hit[1]
+        if self.events:
+            self.events.emit(
+                role="CACHED", to_client=client, hex=resp.hex(), **parse_rtu(req)
+            )
+        return resp
+
+    def _remember(self, req: bytes, resp: bytes) -> None:
+        if not resp or resp[1] & 0x80 or _read_range(req) is None:
+            return
+        now = time.monotonic()
+        if len(self._cache) >= 256:
+            for key, (expires, _) in list(self._cache.items()):
+                if expires < now:
+                    del self._cache[key]
+        self._cache[bytes(req[:6])] = (now + self.read_cache_ttl, resp)
+
+    def _finish(self, job: _Job) -> None:
+        if self.read_cache_ttl > 0 and job.error is None:
+            self._remember(job.req, job.result)
+        job.done.set()
+        if job.on_done is not None:
             try:
-                self.framer.buf.clear()
-                # reset last read timestamp to now so gap heuristics don't
-                # treat immediately following bytes as coming before the
-                # request was sent
-                self.framer.last = time.perf_counter()
+                job.on_done(job)
             except Exception:
-                # be defensive: if clearing fails, continue — we prefer to
-                # attempt the transaction than raise here
+                # e.g. the waiting event loop has already been closed
                 pass
-            if self.events:
-                self.events.emit(
-                    role="REQ",
-                    from_client=client,
-                    crc_ok=crc_ok(req),
-                    hex=req.hex(),
-                    **parse_rtu(req),
-                )
-            self.ser.write(req)
-            self.ser.flush()
-            resp = self.framer.read_frame(timeout=self.rtimeout)
-            self._last_done = time.perf_counter()
-            if not resp and self.events:
-                self.events.emit(
-                    event="downstream_timeout",
-                    role="WARN",
-                    to="INVERTER",
-                    from_client=client,
-                    timeout=self.rtimeout,
-                )
-            if self.events:
-                self.events.emit(
-                    role="RSP",
-                    to_client=client,
-                    crc_ok=crc_ok(resp),
-                    hex=(resp.hex() if resp else ""),
-                    **parse_rtu(resp or b""),
-                )
+
+    def _enforce_spacing(self):
+        wait = self._next_allowed - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+
+    def transact(
+        self,
+        req: bytes,
+        *,
+        client: str = "UNKNOWN",
+        req_crc_ok: Optional[bool] = None,
+    ) -> bytes:
+        """Send ``req`` to the inverter and return its reply (b"" on timeout).
+
+        The reply has always passed the CRC check, since the framer never
+        returns anything else. Callers that built or already verified ``req``
+        can pass ``req_crc_ok`` so the request isn't hashed again for logging.
+        """
+        resp = self._cached(req, client)
+        if resp is not None:
             return resp
+        job = _Job(req, client, req_crc_ok)
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    async def atransact(
+        self,
+        req: bytes,
+        *,
+        client: str = "UNKNOWN",
+        req_crc_ok: Optional[bool] = None,
+    ) -> bytes:
+        """Awaitable :meth:`transact` for event-loop callers.
+
+        The job goes on the same queue, but the worker resolves a future on
+        the caller's loop instead of parking an executor thread per request.
+        """
+        resp = self._cached(req, client)
+        if resp is not None:
+            return resp
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._jobs.put(
+            _Job(
+                req,
+                client,
+                req_crc_ok,
+                lambda job: loop.call_soon_threadsafe(_settle, fut, job),
+            )
+        )
+        return await fut
+
+    def _transact(self, req: bytes, client: str, req_crc_ok: Optional[bool]) -> bytes:
+        if self._cache and (len(req) < 2 or req[1] not in (0x03, 0x04)):
+            self._cache.clear()
+        self._enforce_spacing()
+        # Drain OS input buffer and clear any accumulated bytes in the
+        # framer's internal buffer. If we don't clear the framer buffer
+        # a previously received unsolicited frame can be returned as the
+        # response to this new request, causing mis-attribution and
+        # CRC/timeout confusion. tcflush discards stale input in the kernel
+        # without copying it out; skip the syscall when nothing is waiting.
+        if self.ser.in_waiting:
+            self.ser.reset_input_buffer()
+        try:
+            # also resets the last read timestamp to now so gap heuristics
+            # don't treat immediately following bytes as coming before the
+            # request was sent
+            self.framer.reset()
+        except Exception:
+            # be defensive: if clearing fails, continue — we prefer to
+            # attempt the transaction than raise here
+            pass
+        if self.events:
+            self.events.emit(
+                role="REQ",
+                from_client=client,
+                crc_ok=crc_ok(req) if req_crc_ok is None else req_crc_ok,
+                hex=req.hex(),
+                **parse_rtu(req),
+            )
+        self.ser.write(req)
+        self.ser.flush()
+        expected = _expected_response_len(req)
+        if expected:
+            resp = self.framer.read_expected(expected, timeout=self.rtimeout)
+        else:
+            resp = self.framer.read_frame(timeout=self.rtimeout)
+        self._next_allowed = time.perf_counter() + self.min_cmd_period
+        if not resp and self.events:
+            self.events.emit(
+                event="downstream_timeout",
+                role="WARN",
+                to="INVERTER",
+                from_client=client,
+                timeout=self.rtimeout,
+            )
+        if self.events:
+            self.events.emit(
+                role="RSP",
+                to_client=client,
+                crc_ok=bool(resp),
+                hex=(resp.hex() if resp else ""),
+                **parse_rtu(resp or b""),
+            )
+        return resp
 
 
 class ShineEndpoint(threading.Thread):
@@ -359,15 +1108,7 @@ class ShineEndpoint(threading.Thread):
         self._online = False
 
     def _open_port(self) -> None:
-        databits = int(self.fmt[0])
-        parity = self.fmt[1].upper()
-        stop = int(self.fmt[2])
-        py_par = {
-            "N": serial.PARITY_NONE,
-            "E": serial.PARITY_EVEN,
-            "O": serial.PARITY_ODD,
-        }[parity]
-        py_stp = {1: serial.STOPBITS_ONE, 2: serial.STOPBITS_TWO}[stop]
+        databits, py_par, py_stp, bits_per_char = _parse_fmt(self.fmt)
         self.ser = serial.Serial(
             self.dev,
             self.baud,
@@ -376,7 +1117,7 @@ class ShineEndpoint(threading.Thread):
             stopbits=py_stp,
             timeout=0,
         )
-        bits_per_char = 1 + databits + stop + (0 if parity == "N" else 1)
+        low_latency = set_low_latency(self.ser)
         self.framer = RTUFramer(self.ser, bits_per_char / self.baud)
         self._online = True
         if self.events:
@@ -386,6 +1127,7 @@ class ShineEndpoint(threading.Thread):
                 port=self.dev,
                 baud=self.baud,
                 fmt=self.fmt,
+                low_latency=low_latency,
             )
         # Logging is handled via EventHub/WireLogger; no direct stdout prints here
 
@@ -430,7 +1172,7 @@ class ShineEndpoint(threading.Thread):
                             hex=req.hex(),
                         )
                     continue
-                resp = self.ds.transact(req, client="SHINE")
+                resp = self.ds.transact(req, client="SHINE", req_crc_ok=True)
                 if resp:
                     self.ser.write(resp)
                     self.ser.flush()
@@ -464,62 +1206,102 @@ class ShineEndpoint(threading.Thread):
                 time.sleep(2.0)
 
 
+# MBAP header: transaction id, protocol id, length, unit id
+_MBAP = struct.Struct(">HHHB")
+
+
 class TCPServer(threading.Thread):
+    """Modbus-TCP front end.
+
+    Every connection to one server is handled by a single asyncio event loop
+    running in this thread (uvloop when installed). Requests are queued to
+    the Downstream worker and awaited, so no thread is tied up per client
+    or per pending request.
+    """
+
+    IO_TIMEOUT = 3.0
+
     def __init__(self, bind_host: str, bind_port: int, downstream: Downstream):
         super().__init__(daemon=True)
         self.addr = (bind_host, bind_port)
         self.ds = downstream
+        # Bind synchronously so errors surface in main() and clients can
+        # connect as soon as the constructor returns.
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Inherited by accepted sockets on Linux; set again per connection
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.sock.bind(self.addr)
         self.sock.listen(8)
 
     def run(self):
-        while True:
-            conn, _ = self.sock.accept()
-            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        loop = new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self._serve())
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(self.handle, sock=self.sock)
+        async with server:
+            await server.serve_forever()
 
-    def handle(self, conn: socket.socket):
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
         try:
-            peer = f"TCP:{conn.getpeername()[0]}:{conn.getpeername()[1]}"
-            conn.settimeout(3.0)
+            host, port = writer.get_extra_info("peername")[:2]
+            peer = f"TCP:{host}:{port}"
+            # Replies are one small write each; never let Nagle hold them
+            # back waiting for the client's delayed ACK.
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             while True:
-                hdr = self._recv_exact(conn, 7)
+                hdr = await self._recv_exact(reader, 7)
                 if not hdr:
                     break
-                tid = hdr[0:2]
-                pid = hdr[2:4]
-                length = int.from_bytes(hdr[4:6], "big")
-                uid = hdr[6]
-                pdu = self._recv_exact(conn, length - 1)
+                tid, pid, length, uid = _MBAP.unpack(hdr)
+                pdu = await self._recv_exact(reader, length - 1)
                 if not pdu:
                     break
-                rtu_req = add_crc(bytes([uid]) + pdu)
-                rtu_resp = self.ds.transact(rtu_req, client=peer)
-                if not rtu_resp or len(rtu_resp) < 4 or not crc_ok(rtu_resp):
+                # uid + PDU + CRC assembled in one buffer
+                n = len(pdu) + 1
+                rtu_req = bytearray(n + 2)
+                rtu_req[0] = uid
+                rtu_req[1:n] = pdu
+                with memoryview(rtu_req) as mv:
+                    _U16LE.pack_into(rtu_req, n, modbus_crc(mv[:n]))
+                rtu_resp = await self.ds.atransact(
+                    rtu_req, client=peer, req_crc_ok=True
+                )
+                # Replies are CRC-checked by the framer; empty means timeout
+                if not rtu_resp:
                     break
-                uid2 = rtu_resp[0]
-                pdu2 = rtu_resp[1:-2]
-                rsp_len = len(pdu2) + 1
-                mbap = tid + pid + rsp_len.to_bytes(2, "big") + bytes([uid2])
-                conn.sendall(mbap + pdu2)
+                # MBAP header + PDU (RTU reply minus uid and CRC) in one buffer
+                n = len(rtu_resp) - 2
+                out = bytearray(n + 6)
+                _MBAP.pack_into(out, 0, tid, pid, n, rtu_resp[0])
+                out[7:] = memoryview(rtu_resp)[1:n]
+                writer.write(out)
+                await asyncio.wait_for(writer.drain(), self.IO_TIMEOUT)
         except Exception:
             pass
         finally:
             try:
-                conn.close()
+                writer.close()
             except Exception:
                 pass
 
-    @staticmethod
-    def _recv_exact(conn: socket.socket, n: int) -> bytes:
-        buf = b""
-        while len(buf) < n:
-            chunk = conn.recv(n - len(buf))
-            if not chunk:
-                return b""
-            buf += chunk
-        return buf
+    @classmethod
+    async def _recv_exact(cls, reader: asyncio.StreamReader, n: int) -> bytes:
+        # readexactly fills one buffer for the whole read, so fragmented
+        # PDUs don't cost a reallocation per chunk. Idle or stalled clients
+        # are dropped after IO_TIMEOUT.
+        if n <= 0:
+            return b""
+        try:
+            return await asyncio.wait_for(reader.readexactly(n), cls.IO_TIMEOUT)
+        except asyncio.IncompleteReadError:
+            return b""
 
 
 def main():
@@ -568,6 +1350,20 @@ def main():
     ap.add_argument(
         "--rtimeout", type=float, default=1.5, help="RTU read timeout seconds"
     )
+    ap.add_argument(
+        "--coalesce-window",
+        type=float,
+        default=None,
+        help="Merge adjacent 0x03/0x04 reads queued within this many seconds "
+        "into one RTU request (0 = only already-queued requests; default off)",
+    )
+    ap.add_argument(
+        "--read-cache-ttl",
+        type=float,
+        default=0.0,
+        help="Answer repeated identical 0x03/0x04 reads from a cache for this "
+        "many seconds (0 = disabled)",
+    )
     ap.add_argument(
         "--log",
         default="/var/log/growatt_broker.jsonl",
@@ -604,6 +1400,8 @@ def main():
         inv_bytes,
         min_cmd_period=args.min_period,
         rtimeout=args.rtimeout,
+        coalesce_window=args.coalesce_window,
+        read_cache_ttl=args.read_cache_ttl,
         events=events,
     )
     shine = None
@@ -639,14 +1437,22 @@ def main():
     ]
     if sniff_desc:
         parts.append(f"SNIFF={sniff_desc}")
+    if ds.low_latency:
+        parts.append("LOWLAT=on")
     if file_logger.enabled():
         parts.append(f"LOG={file_logger.path}")
     else:
         parts.append("LOG=disabled")
     print("Broker up. " + "  ".join(parts))
 
-    while True:
-        time.sleep(3600)
+    # Park the main thread until SIGTERM (systemd, docker stop) or Ctrl-C,
+    # then shut down in order instead of dying mid-transaction.
+    shutdown = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: shutdown.set())
+    shutdown.wait()
+    ds.close()
+    file_logger.close()
 
 
 if __name__ == "__main__":
@@ -34,7 +34,8 @@ def _add_common_backend_args(ap: argparse.ArgumentParser):
         help="Backend mode (live not yet implemented)",
     )
     ap.add_argument(
-        "--dataset", help="Path to dataset JSON (required for dataset mode)"
+        "--dataset",
+        help="Path to dataset JSON or packed .bin (required for dataset mode)",
     )
     ap.add_argument(
         "--mutate",
@@ -88,7 +89,11 @@ async def main_async(argv=None):
         print(f"[INFO] Capture enabled -> {args.out}")
 
     print(f"[INFO] Starting backend mode={args.mode} duration={args.duration}s")
-    await _demo_poll(backend, args.duration)
+    try:
+        await _demo_poll(backend, args.duration)
+    finally:
+        if isinstance(backend, CaptureBackend):
+            await backend.aclose()
     print("[INFO] Finished demo run")
     return 0
 
@@ -26,7 +26,7 @@ import contextlib
 import json
 import logging
 import importlib, inspect
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from contextlib import asynccontextmanager
 from typing import Any, Callable, Dict, Iterable, Tuple
@@ -182,6 +182,23 @@ class SimulatorEndpoint:
     host: str | None
     port: int | None
     serial_port: str | None
+    # Set once the server is listening (TCP) or has opened its port (serial)
+    ready: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    # Number of completed mutation ticks
+    tick: int = 0
+    _tick_changed: asyncio.Condition = field(
+        default_factory=asyncio.Condition, repr=False
+    )
+
+    async def wait_for_tick(self, tick: int) -> None:
+        """Wait until at least ``tick`` mutation ticks have been applied."""
+        async with self._tick_changed:
+            await self._tick_changed.wait_for(lambda: self.tick >= tick)
+
+    async def _advance_tick(self, tick: int) -> None:
+        async with self._tick_changed:
+            self.tick = tick
+            self._tick_changed.notify_all()
 
     def __iter__(self):
         return iter((self.host, self.port))
@@ -204,6 +221,7 @@ async def start_simulator(
     force_deterministic: bool = False,
     strict_defs: bool = False,
     mutators: list[str] | None = None,
+    tick_interval: float = 1.0,
     debug_wire: bool = False,
     mode: str = "tcp",
     serial_port: str | None = None,
@@ -216,6 +234,9 @@ async def start_simulator(
 ):
     """Start a Modbus simulator serving predefined registers over TCP or serial.
 
+    In TCP mode ``port=0`` binds an OS-assigned port, which the yielded
+    endpoint reports.
+
     Backwards compatibility:
         Previously accepted a single positional argument (port). Support that pattern while
         encouraging keyword usage going forward.
@@ -324,7 +345,14 @@ async def start_simulator(
         )
         location = f"{host}:{port}"
 
-    task = asyncio.create_task(server.serve_forever())
+    # Returns once listening (or the serial port is open); serving continues
+    # on the loop until shutdown().
+    await server.serve_forever(background=True)
+    if mode_normalized == "tcp":
+        # port=0 lets the OS pick; report the port actually bound
+        endpoint.port = server.transport.sockets[0].getsockname()[1]
+        location = f"{host}:{endpoint.port}"
+    endpoint.ready.set()
     log_suffix = ""
     if mode_normalized == "serial":
         log_suffix = (
@@ -368,16 +396,15 @@ async def start_simulator(
                 hr_block.setValues(reg, [val])
             for reg, val in input_values.items():
                 ir_block.setValues(reg, [val])
+            await endpoint._advance_tick(_tick)
             try:
-                await asyncio.wait_for(_stop.wait(), timeout=1.0)
+                await asyncio.wait_for(_stop.wait(), timeout=tick_interval)
             except asyncio.TimeoutError:
                 pass
 
     mutation_task = asyncio.create_task(_mutation_loop())
 
     try:
-        # Brief pause to ensure server socket is bound before yielding to caller
-        await asyncio.sleep(0.05)
         yield endpoint
     finally:
         _stop.set()
@@ -385,9 +412,6 @@ async def start_simulator(
         with contextlib.suppress(asyncio.CancelledError):
             await mutation_task
         await server.shutdown()
-        task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await task
         _LOGGER.info("Simulator stopped")
 
 
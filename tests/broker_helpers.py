@@ -0,0 +1,81 @@
+"""Helpers for running the broker as a subprocess in tests."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+import os
+import socket
+import sys
+from typing import AsyncIterator
+
+__all__ = ["broker_process", "free_port", "wait_for_line"]
+
+
+def free_port() -> int:
+    """Return a TCP port on localhost that is currently free."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+async def wait_for_line(stream, text: str, timeout: float = 5.0) -> str:
+    """Read ``stream`` until a line containing ``text`` arrives."""
+
+    async def _read():
+        while True:
+            line = await stream.readline()
+            if not line:
+                raise RuntimeError("Broker exited before signalling readiness")
+            decoded = line.decode().strip()
+            if text in decoded:
+                return decoded
+
+    return await asyncio.wait_for(_read(), timeout)
+
+
+@asynccontextmanager
+async def broker_process(*args: str) -> AsyncIterator[asyncio.subprocess.Process]:
+    """Run ``python -m growatt_broker.broker`` until it reports "Broker up".
+
+    The broker gets its own session so terminal signals aimed at pytest don't
+    reach it. On exit it is terminated (killed after 5 s) and an unexpected
+    exit code fails with the captured output.
+    """
+    env = os.environ.copy()
+    env.setdefault("PYTHONUNBUFFERED", "1")
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "growatt_broker.broker",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+        start_new_session=True,
+    )
+    assert proc.stdout is not None
+    assert proc.stderr is not None
+    try:
+        await wait_for_line(proc.stdout, "Broker up")
+        yield proc
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+        if proc.returncode not in (0, -15, -9):
+            stdout_left = await proc.stdout.read()
+            stderr_left = await proc.stderr.read()
+            raise RuntimeError(
+                "Broker subprocess exited with code {}.\nSTDOUT:\n{}\nSTDERR:\n{}".format(
+                    proc.returncode,
+                    stdout_left.decode(),
+                    stderr_left.decode(),
+                )
+            )
@@ -4,6 +4,11 @@ from __future__ import annotations
 
 import asyncio
 import pytest
+import pytest_asyncio
+
+from growatt_broker.simulator import start_simulator
+from .broker_helpers import broker_process, free_port
+from .serial_helpers import serial_environment_available, virtual_serial_pair
 
 # Reset to the default policy so asyncio.get_event_loop() works even when
 # pytest_homeassistant_custom_component is installed in the environment.
@@ -42,3 +47,49 @@ def verify_cleanup():
 def _enable_socket(socket_enabled):
     """Allow network access for tests requiring sockets."""
     yield
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def serial_broker(tmp_path_factory):
+    """Broker wired to a serial simulator, started once and shared.
+
+    Yields the broker's TCP port. Tests using it run on the session loop (the
+    configured default), open their own clients and should be marked
+    ``xdist_group("serial_broker")`` so pytest-xdist keeps them on one worker.
+    The wire log goes to a file so an unread stdout pipe can't stall the
+    broker.
+    """
+    if not serial_environment_available():
+        pytest.skip("virtual serial ports unavailable")
+    tcp_port = free_port()
+    log_path = tmp_path_factory.mktemp("serial_broker") / "broker.jsonl"
+    async with virtual_serial_pair() as (sim_port, broker_inverter_port):
+        async with virtual_serial_pair() as (shine_port, _):
+            async with start_simulator(
+                mode="serial",
+                serial_port=sim_port,
+                force_deterministic=True,
+            ):
+                async with broker_process(
+                    "--inverter",
+                    broker_inverter_port,
+                    "--shine",
+                    shine_port,
+                    "--inv-baud",
+                    "9600",
+                    "--shine-baud",
+                    "9600",
+                    "--baud",
+                    "9600",
+                    "--bytes",
+                    "8N1",
+                    "--tcp",
+                    f"127.0.0.1:{tcp_port}",
+                    "--min-period",
+                    "0.05",
+                    "--rtimeout",
+                    "0.5",
+                    "--log",
+                    str(log_path),
+                ):
+                    yield tcp_port
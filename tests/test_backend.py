@@ -19,6 +19,22 @@ async def test_dataset_backend_basic(tmp_path):
     assert await backend.read_holding(1, 30, 3) == [55, 2, 3]
 
 
+@pytest.mark.asyncio
+async def test_dataset_backend_writes_clip_to_address_space(tmp_path):
+    dataset_path = tmp_path / "data.json"
+    dataset_path.write_text(json.dumps({}), encoding="utf-8")
+    backend = backend_module.DatasetBackend(dataset_path)
+
+    await backend.write_multiple(1, 65534, [1, 2, 3, 4])
+    await backend.write_multiple(1, -2, [5, 6, 7])
+    await backend.write_single(1, 70000, 9)
+    await backend.write_single(1, -1, 9)
+
+    assert len(backend.holding) == backend_module.REGISTER_SPACE
+    assert await backend.read_holding(1, 65534, 4) == [1, 2, 0, 0]
+    assert await backend.read_holding(1, 0, 2) == [7, 0]
+
+
 @pytest.mark.asyncio
 async def test_dataset_backend_mutation(tmp_path, monkeypatch):
     dataset = {"holding": {"150": 1}}
@@ -53,3 +69,34 @@ async def test_capture_backend_logs(tmp_path):
     assert evt1["regs"] == [100]
     assert evt2["op"] == "write_single"
     assert evt2["value"] == 7
+
+
+@pytest.mark.asyncio
+async def test_dataset_backend_mutation_spans_boundary(tmp_path, monkeypatch):
+    dataset = {"input": {"100": 7, "101": 7}}
+    dataset_path = tmp_path / "dataset.json"
+    dataset_path.write_text(json.dumps(dataset), encoding="utf-8")
+
+    monkeypatch.setattr(backend_module.time, "time", lambda: 1000.0)
+    backend = backend_module.DatasetBackend(dataset_path, mutate=True)
+
+    monkeypatch.setattr(backend_module.time, "time", lambda: 1003.0)
+    # Only addresses above 100 are mutated; missing addresses read as 0 (+elapsed)
+    assert await backend.read_input(1, 99, 4) == [0, 7, 10, 3]
+
+
+@pytest.mark.asyncio
+async def test_dataset_backend_packed_roundtrip(tmp_path):
+    dataset_path = tmp_path / "data.json"
+    dataset_path.write_text(
+        json.dumps({"holding": {"30": 100, "65535": 7}, "input": {"0": 1}}),
+        encoding="utf-8",
+    )
+    packed_path = tmp_path / "data.bin"
+    backend_module.DatasetBackend(dataset_path).save_packed(packed_path)
+
+    assert packed_path.stat().st_size == 4 * backend_module.REGISTER_SPACE
+    backend = backend_module.DatasetBackend(packed_path)
+    assert await backend.read_holding(1, 29, 2) == [0, 100]
+    assert await backend.read_holding(1, 65535, 1) == [7]
+    assert await backend.read_input(1, 0, 2) == [1, 0]
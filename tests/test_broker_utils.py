@@ -1,5 +1,29 @@
+import datetime
 import json
-from growatt_broker.broker import modbus_crc, add_crc, crc_ok, parse_rtu
+import os
+import socket
+import struct
+import threading
+import time
+
+import pytest
+import serial
+
+from growatt_broker.broker import (
+    RTUFramer,
+    SnifferRelay,
+    WireLogger,
+    _Job,
+    _coalesce_reads,
+    _parse_fmt,
+    _modbus_crc_table,
+    modbus_crc,
+    add_crc,
+    crc_ok,
+    now_iso,
+    parse_rtu,
+    set_low_latency,
+)
 
 
 def test_crc_and_parse():
@@ -14,3 +38,245 @@ def test_crc_and_parse():
 
     parsed = parse_rtu(frame)
     assert parsed == {'uid': 1, 'func': 3, 'len': 4, 'addr': 0, 'count': 10}
+
+
+def test_crc_table_matches_bitwise_reference():
+    def reference(data: bytes) -> int:
+        crc = 0xFFFF
+        for b in data:
+            crc ^= b
+            for _ in range(8):
+                crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
+        return crc
+
+    for data in (b"", b"\x00", bytes(range(256)), bytes.fromhex("0110000a0002")):
+        assert _modbus_crc_table(data) == reference(data)
+        assert modbus_crc(data) == reference(data)
+
+    # Long frames take the word-at-a-time path; cover odd tails and views
+    # that start at an odd offset inside a larger buffer.
+    for n in (16, 17, 255):
+        data = bytes((i * 37 + 11) & 0xFF for i in range(n))
+        assert _modbus_crc_table(data) == reference(data)
+        view = memoryview(bytearray(b"\xaa" + data))[1:]
+        assert _modbus_crc_table(view) == reference(data)
+
+
+class _FakeSerial:
+    def __init__(self, data: bytes = b""):
+        self.data = bytearray(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.data)
+
+    def read(self, n: int = 1) -> bytes:
+        chunk = bytes(self.data[:n])
+        del self.data[:n]
+        return chunk
+
+
+def test_framer_splits_combined_frames_and_skips_garbage():
+    req = add_crc(bytes.fromhex("010400000002"))
+    rsp = add_crc(bytes.fromhex("01040400010002"))
+    exc = add_crc(bytes.fromhex("018402"))
+    ser = _FakeSerial(b"\xff\x00" + rsp + req + exc)
+    framer = RTUFramer(ser, char_time=0.0001)
+
+    assert framer.read_frame(timeout=0.1) == rsp
+    assert framer.read_frame(timeout=0.1) == req
+    assert framer.read_frame(timeout=0.1) == exc
+    assert framer.read_frame(timeout=0.01) == b""
+
+
+def test_framer_waits_for_idle_line_on_real_tty():
+    # pyserial on a pty (like a real POSIX port) returns short reads while a
+    # frame is still arriving, so only an idle line may close the frame.
+    pty = pytest.importorskip("pty")
+    tty = pytest.importorskip("tty")
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    ser = serial.Serial(os.ttyname(slave))
+    # 85 bytes at ~1 byte/ms spans several read timeouts (one gap each)
+    rsp = add_crc(bytes([1, 4, 80]) + bytes(range(80)))
+
+    def trickle():
+        for b in rsp:
+            os.write(master, bytes([b]))
+            time.sleep(0.001)
+
+    try:
+        framer = RTUFramer(ser, char_time=0.004)
+        scanned = []
+        find_frame = framer._find_frame
+        framer._find_frame = lambda: scanned.append(framer.pending()) or find_frame()
+        writer = threading.Thread(target=trickle)
+        writer.start()
+        assert framer.read_frame(timeout=2.0) == rsp
+        writer.join()
+        assert scanned == [len(rsp)]
+    finally:
+        ser.close()
+        os.close(master)
+        os.close(slave)
+
+
+def test_framer_reuses_buffer_across_backlog():
+    frames = [add_crc(bytes([1, 4, 4, 0, i, 0, 2])) for i in range(200)]
+    # an initial backlog larger than the preallocated buffer, then a trickle
+    # that forces the unconsumed tail to be slid back to the front
+    ser = _FakeSerial(b"".join(frames[:100]))
+    framer = RTUFramer(ser, char_time=0.0001)
+
+    for i, frame in enumerate(frames):
+        assert framer.read_frame(timeout=0.1) == frame
+        if i + 100 < len(frames):
+            ser.data.extend(frames[i + 100])
+    assert framer.pending() == 0
+
+
+def test_framer_read_expected_handles_exception_reply():
+    exc = add_crc(bytes.fromhex("018302"))
+    framer = RTUFramer(_FakeSerial(exc), char_time=0.0001)
+    assert framer.read_expected(9, timeout=0.1) == exc
+
+    rsp = add_crc(bytes.fromhex("0103020007"))
+    ser = _FakeSerial(rsp + b"\x00")
+    framer = RTUFramer(ser, char_time=0.0001)
+    assert framer.read_expected(len(rsp), timeout=0.1) == rsp
+    # trailing byte is left unread rather than waiting for a gap
+    assert ser.in_waiting == 1
+
+
+def test_coalesce_reads_merges_adjacent_ranges_only():
+    def job(func, addr, count, uid=1):
+        req = add_crc(bytes([uid, func]) + struct.pack(">HH", addr, count))
+        return _Job(req, "c", True)
+
+    a, b, c = job(3, 10, 2), job(3, 12, 3), job(3, 11, 1)  # adjoin / overlap
+    d = job(4, 14, 1)  # other function
+    e = job(3, 16, 1)  # gap after b
+    f = job(3, 15, 1, uid=2)  # other unit
+    g = add_crc(bytes.fromhex("010600010007"))
+    w = _Job(g, "c", True)
+    big1, big2 = job(3, 200, 100), job(3, 300, 30)  # would exceed 125 regs
+
+    groups = _coalesce_reads([a, d, b, w, c, e, f, big1, big2])
+    # the write is a barrier: c, queued after w, must not join a's group
+    assert groups == [[a, b], [d], [w], [c], [e], [f], [big1], [big2]]
+
+    # read-after-write on the very register being written
+    r0 = job(3, 0, 2)
+    ws = _Job(add_crc(bytes.fromhex("010600010007")), "c", True)
+    r1 = job(3, 1, 1)
+    assert _coalesce_reads([r0, ws, r1]) == [[r0], [ws], [r1]]
+
+
+def test_parse_fmt():
+    assert _parse_fmt("8E1") == (8, serial.PARITY_EVEN, serial.STOPBITS_ONE, 11)
+    assert _parse_fmt("8n2") == (8, serial.PARITY_NONE, serial.STOPBITS_TWO, 11)
+
+
+def test_set_low_latency_is_best_effort():
+    assert set_low_latency(_FakeSerial()) is False
+
+    class _Unsupported(_FakeSerial):
+        def set_low_latency_mode(self, enable):
+            raise ValueError("Failed to update ASYNC_LOW_LATENCY flag")
+
+    class _Supported(_FakeSerial):
+        def set_low_latency_mode(self, enable):
+            self.low_latency = enable
+
+    assert set_low_latency(_Unsupported()) is False
+    ser = _Supported()
+    assert set_low_latency(ser) is True and ser.low_latency is True
+
+
+def test_wire_logger_reopens_after_rotation(tmp_path):
+    path = tmp_path / "wire.jsonl"
+    logger = WireLogger(str(path), sync_interval=0)
+    logger.handle({"role": "REQ", "n": 1})
+    logger.flush()
+    path.rename(tmp_path / "wire.jsonl.1")
+    logger.handle({"role": "REQ", "n": 2})  # lands in rotated file, then reopens
+    logger.flush()
+    logger.handle({"role": "REQ", "n": 3})
+    logger.close()
+
+    rotated = (tmp_path / "wire.jsonl.1").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["n"] for line in rotated] == [1, 2]
+    assert json.loads(path.read_text(encoding="utf-8"))["n"] == 3
+
+
+def test_wire_logger_counts_and_reports_dropped_events(tmp_path):
+    class SmallLogger(WireLogger):
+        MAX_QUEUE = 2
+
+    path = tmp_path / "wire.jsonl"
+    logger = SmallLogger(str(path), sync_interval=0)
+    release = threading.Event()
+    write = logger._write
+    logger._write = lambda data: release.wait(2) and write(data)
+
+    logger.handle({"n": 1})
+    deadline = time.monotonic() + 2
+    while logger._q.qsize() and time.monotonic() < deadline:
+        time.sleep(0.005)  # writer is now blocked holding event 1
+    for n in (2, 3, 4, 5):
+        logger.handle({"n": n})
+    assert logger.dropped == 2
+    release.set()
+    logger.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line.get("n") for line in lines if "n" in line] == [1, 2, 3]
+    assert lines[-1]["event"] == "log_dropped" and lines[-1]["count"] == 2
+
+
+def test_sniffer_relay_streams_lines_to_subscribers():
+    relay = SnifferRelay("127.0.0.1", 0)
+    relay.start()
+    client = socket.create_connection(relay.sock.getsockname(), timeout=2)
+    try:
+        deadline = time.monotonic() + 2
+        while not relay._outq and time.monotonic() < deadline:
+            time.sleep(0.01)
+        relay.handle({"role": "REQ", "n": 1})
+        relay.handle({"role": "RSP", "n": 2})
+        received = b""
+        while received.count(b"\n") < 2:
+            received += client.recv(4096)
+        assert [json.loads(x)["n"] for x in received.splitlines()] == [1, 2]
+    finally:
+        client.close()
+        relay.sock.close()
+
+
+def test_framer_finds_unknown_function_frames_by_crc():
+    frame = add_crc(bytes.fromhex("012b0e01"))  # 0x2B: not length-decodable
+    framer = RTUFramer(_FakeSerial(b"\x07" + frame), char_time=0.0001)
+    assert framer.read_frame(timeout=0.1) == frame
+
+
+def test_framer_does_not_rescan_unchanged_buffer(monkeypatch):
+    import growatt_broker.broker as broker
+
+    calls = []
+    real = broker._expected_rtu_lens
+    monkeypatch.setattr(
+        broker, "_expected_rtu_lens", lambda *a: calls.append(a) or real(*a)
+    )
+    framer = RTUFramer(_FakeSerial(b"\x01\x03\x00\x00\x00"), char_time=0.0001)
+    assert framer.read_frame(timeout=0.05) == b""
+    scans = len(calls)
+    assert framer.read_frame(timeout=0.05) == b""
+    assert len(calls) == scans
+
+
+def test_now_iso_matches_datetime_format():
+    before = datetime.datetime.now().replace(microsecond=0)
+    stamp = now_iso()
+    parsed = datetime.datetime.fromisoformat(stamp)
+    assert len(stamp) == len("2025-01-01T00:00:00.000")
+    assert before <= parsed <= datetime.datetime.now()
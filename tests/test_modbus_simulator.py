@@ -1,9 +1,7 @@
 import asyncio
-import socket
-import importlib
 import sys
+import types
 import json
-import os
 
 import pytest
 from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
@@ -28,65 +26,42 @@ def test_serial_environment_required():
     )
 
 
-def _free_port() -> int:
-    sock = socket.socket()
-    sock.bind(("127.0.0.1", 0))
-    port = sock.getsockname()[1]
-    sock.close()
-    return port
+# Modbus TCP read_input_registers(0, count=2) for unit 1, transaction 1, and
+# the reply carrying registers [1, 2]
+READ_IR_0_2 = bytes.fromhex("000100000006010400000002")
+READ_IR_0_2_REPLY = bytes.fromhex("00010000000701040400010002")
 
 
-async def _wait_for_line(stream, text: str, timeout: float = 5.0) -> str:
-    async def _read():
-        while True:
-            line = await stream.readline()
-            if not line:
-                raise RuntimeError("Broker exited before signalling readiness")
-            decoded = line.decode().strip()
-            if text in decoded:
-                return decoded
-
-    return await asyncio.wait_for(_read(), timeout)
+async def _raw_roundtrip(host: str, port: int, request: bytes, reply_len: int) -> bytes:
+    """Send a prebuilt Modbus TCP request and return the raw reply bytes."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(request)
+        await writer.drain()
+        return await asyncio.wait_for(reader.readexactly(reply_len), timeout=2)
+    finally:
+        writer.close()
+        await writer.wait_closed()
 
 
 @pytest.mark.asyncio
 async def test_positional_port_and_custom_host():
-    # Find a free port first
-    s = socket.socket()
-    s.bind(("127.0.0.1", 0))
-    port = s.getsockname()[1]
-    s.close()
-    async with start_simulator(port, host="127.0.0.1") as (host, real_port):
-        assert real_port == port
+    async with start_simulator(0, host="127.0.0.1") as (host, real_port):
+        assert real_port != 0
         assert host == "127.0.0.1"
-        client = AsyncModbusTcpClient(
-            host, port=real_port, framer=FramerType.SOCKET, reconnect_delay=0
+        resp = await _raw_roundtrip(
+            host, real_port, READ_IR_0_2, len(READ_IR_0_2_REPLY)
         )
-        await client.connect()
-        # Brief sleep to ensure server task fully entered serve loop
-        await asyncio.sleep(0.05)
-        rr = await client.read_input_registers(0, count=2)
-        assert not rr.isError()
-        assert rr.registers == [1, 2]
-    client.close()
+        assert resp == READ_IR_0_2_REPLY
 
 
 @pytest.mark.asyncio
 async def test_default_dataset_values():
-    s = socket.socket()
-    s.bind(("127.0.0.1", 0))
-    port = s.getsockname()[1]
-    s.close()
-    async with start_simulator(port) as (host, real_port):
-        client = AsyncModbusTcpClient(
-            host, port=real_port, framer=FramerType.SOCKET, reconnect_delay=0
+    async with start_simulator(0) as (host, real_port):
+        resp = await _raw_roundtrip(
+            host, real_port, READ_IR_0_2, len(READ_IR_0_2_REPLY)
         )
-        await client.connect()
-        await asyncio.sleep(0.05)
-        rr = await client.read_input_registers(0, count=2)
-        assert not rr.isError()
-        assert rr.registers == [1, 2]
-    client.close()
+        assert resp == READ_IR_0_2_REPLY
 
 
 @pytest.mark.asyncio
@@ -112,7 +87,6 @@ async def test_default_dataset_values_serial():
             )
             try:
                 await client.connect()
-                await asyncio.sleep(0.1)
                 rr = await client.read_input_registers(0, count=2, device_id=1)
                 assert not rr.isError()
                 assert rr.registers == [1, 2]
@@ -121,175 +95,105 @@ async def test_default_dataset_values_serial():
 
 
 @pytest.mark.asyncio
+@pytest.mark.xdist_group("serial_broker")
 @pytest.mark.skipif(not SERIAL_AVAILABLE, reason="virtual serial ports unavailable")
-async def test_broker_tcp_roundtrip_with_serial_simulator(tmp_path):
-    tcp_port = _free_port()
-
-    async with virtual_serial_pair() as (sim_port, broker_inverter_port):
-        async with virtual_serial_pair() as (shine_port, _):
-            async with start_simulator(
-                mode="serial",
-                serial_port=sim_port,
-                force_deterministic=True,
-            ):
-                env = os.environ.copy()
-                env.setdefault("PYTHONUNBUFFERED", "1")
-                proc = await asyncio.create_subprocess_exec(
-                    sys.executable,
-                    "-m",
-                    "growatt_broker.broker",
-                    "--inverter",
-                    broker_inverter_port,
-                    "--shine",
-                    shine_port,
-                    "--inv-baud",
-                    "9600",
-                    "--shine-baud",
-                    "9600",
-                    "--baud",
-                    "9600",
-                    "--bytes",
-                    "8N1",
-                    "--tcp",
-                    f"127.0.0.1:{tcp_port}",
-                    "--min-period",
-                    "0.05",
-                    "--rtimeout",
-                    "0.5",
-                    "--log",
-                    "-",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    env=env,
-                )
+async def test_broker_tcp_roundtrip_with_serial_simulator(serial_broker):
+    client = AsyncModbusTcpClient(
+        "127.0.0.1",
+        port=serial_broker,
+        framer=FramerType.SOCKET,
+        timeout=2,
+        retries=1,
+        reconnect_delay=0,
+    )
+    try:
+        connected = await client.connect()
+        assert connected and client.connected
+        rr = await client.read_input_registers(0, count=2, device_id=1)
+        assert not rr.isError()
+        assert rr.registers == [1, 2]
+    finally:
+        client.close()
 
-                assert proc.stdout is not None
-                assert proc.stderr is not None
-                try:
-                    await _wait_for_line(proc.stdout, "Broker up")
 
-                    client = AsyncModbusTcpClient(
-                        "127.0.0.1",
-                        port=tcp_port,
-                        framer=FramerType.SOCKET,
-                        timeout=2,
-                        retries=1,
-                        reconnect_delay=0,
-                    )
-                    try:
-                        connected = await client.connect()
-                        assert connected and client.connected
-                        await asyncio.sleep(0.1)
-                        rr = await client.read_input_registers(0, count=2, device_id=1)
-                        assert not rr.isError()
-                        assert rr.registers == [1, 2]
-                    finally:
-                        client.close()
-                finally:
-                    proc.terminate()
-                    try:
-                        await asyncio.wait_for(proc.wait(), timeout=5)
-                    except asyncio.TimeoutError:
-                        proc.kill()
-                        await proc.wait()
-                    stdout_left = await proc.stdout.read()
-                    stderr_left = await proc.stderr.read()
-                    if proc.returncode not in (0, -15, -9, None):
-                        pytest.fail(
-                            "Broker subprocess exited with code {}.\nSTDOUT:\n{}\nSTDERR:\n{}".format(
-                                proc.returncode,
-                                stdout_left.decode(),
-                                stderr_left.decode(),
-                            )
-                        )
+def _install_mutator(monkeypatch, source: str) -> types.ModuleType:
+    """Register ``source`` as the in-memory module ``temp_mutator``."""
+    mod = types.ModuleType("temp_mutator")
+    exec(source, mod.__dict__)
+    monkeypatch.setitem(sys.modules, "temp_mutator", mod)
+    return mod
 
 
 @pytest.mark.asyncio
-async def test_mutation_plugin_application(tmp_path, monkeypatch):
-    # Create a temporary module acting as a mutator
-    mod_path = tmp_path / "temp_mutator.py"
-    mod_path.write_text(
+async def test_mutation_plugin_application(monkeypatch):
+    # Provide an in-memory module acting as a mutator
+    temp_mod = _install_mutator(
+        monkeypatch,
         "tick_values = []\n"
         "def mutate(registers, tick):\n"
         "    # Increment register 1 each tick starting from existing value\n"
         "    registers['input'][1] = registers['input'].get(1, 0) + 10\n"
-        "    tick_values.append(registers['input'][1])\n"
+        "    tick_values.append(registers['input'][1])\n",
     )
-    sys.path.insert(0, str(tmp_path))
-    try:
-        s = socket.socket()
-        s.bind(("127.0.0.1", 0))
-        port = s.getsockname()[1]
-        s.close()
-        async with start_simulator(port, mutators=["temp_mutator"]) as (
-            host,
-            real_port,
-        ):
-            client = AsyncModbusTcpClient(
-                host, port=real_port, framer=FramerType.SOCKET, reconnect_delay=0
-            )
-            await client.connect()
-            # Read initial value after first tick sleep (~0.05s in ctx + <1s before first loop)
-            await asyncio.sleep(1.2)
-            # Address 0 maps to our seeded register 1 which the mutator increments
-            rr1 = await client.read_input_registers(0, count=1)
-            first = rr1.registers[0]
-            await asyncio.sleep(1.1)
-            rr2 = await client.read_input_registers(0, count=1)
-            second = rr2.registers[0]
-            assert second > first >= 10  # mutated at least once
-            client.close()
-        temp_mod = importlib.import_module("temp_mutator")
-        assert len(temp_mod.tick_values) >= 2
-    finally:
-        if str(tmp_path) in sys.path:
-            sys.path.remove(str(tmp_path))
+    async with start_simulator(
+        0, mutators=["temp_mutator"], tick_interval=0.1
+    ) as endpoint:
+        host, real_port = endpoint
+        client = AsyncModbusTcpClient(
+            host, port=real_port, framer=FramerType.SOCKET, reconnect_delay=0
+        )
+        await client.connect()
+        await endpoint.wait_for_tick(1)
+        # Address 0 maps to our seeded register 1 which the mutator increments
+        rr1 = await client.read_input_registers(0, count=1)
+        first = rr1.registers[0]
+        await endpoint.wait_for_tick(endpoint.tick + 1)
+        rr2 = await client.read_input_registers(0, count=1)
+        second = rr2.registers[0]
+        assert second > first >= 10  # mutated at least once
+        client.close()
+    assert len(temp_mod.tick_values) >= 2
 
 
 @pytest.mark.asyncio
 @pytest.mark.skipif(not SERIAL_AVAILABLE, reason="virtual serial ports unavailable")
-async def test_mutation_plugin_application_serial(tmp_path):
-    mod_path = tmp_path / "temp_mutator.py"
-    mod_path.write_text(
+async def test_mutation_plugin_application_serial(monkeypatch):
+    temp_mod = _install_mutator(
+        monkeypatch,
         "tick_values = []\n"
         "def mutate(registers, tick):\n"
         "    registers['input'][1] = registers['input'].get(1, 0) + 5\n"
-        "    tick_values.append(registers['input'][1])\n"
+        "    tick_values.append(registers['input'][1])\n",
     )
-    sys.path.insert(0, str(tmp_path))
-    try:
-        async with virtual_serial_pair() as (sim_port, client_port):
-            async with start_simulator(
-                mode="serial",
-                serial_port=sim_port,
-                mutators=["temp_mutator"],
-            ):
-                client = AsyncModbusSerialClient(
-                    client_port,
-                    framer=FramerType.RTU,
-                    baudrate=9600,
-                    stopbits=1,
-                    bytesize=8,
-                    parity="N",
-                    timeout=1,
-                    reconnect_delay=0,
-                )
-                try:
-                    await client.connect()
-                    await asyncio.sleep(1.2)
-                    rr1 = await client.read_input_registers(0, count=1, device_id=1)
-                    first = rr1.registers[0]
-                    await asyncio.sleep(1.1)
-                    rr2 = await client.read_input_registers(0, count=1, device_id=1)
-                    second = rr2.registers[0]
-                    assert second > first >= 5
-                finally:
-                    client.close()
-        temp_mod = importlib.import_module("temp_mutator")
-        assert len(temp_mod.tick_values) >= 2
-    finally:
-        if str(tmp_path) in sys.path:
-            sys.path.remove(str(tmp_path))
+    async with virtual_serial_pair() as (sim_port, client_port):
+        async with start_simulator(
+            mode="serial",
+            serial_port=sim_port,
+            mutators=["temp_mutator"],
+            tick_interval=0.1,
+        ) as endpoint:
+            client = AsyncModbusSerialClient(
+                client_port,
+                framer=FramerType.RTU,
+                baudrate=9600,
+                stopbits=1,
+                bytesize=8,
+                parity="N",
+                timeout=1,
+                reconnect_delay=0,
+            )
+            try:
+                await client.connect()
+                await endpoint.wait_for_tick(1)
+                rr1 = await client.read_input_registers(0, count=1, device_id=1)
+                first = rr1.registers[0]
+                await endpoint.wait_for_tick(endpoint.tick + 1)
+                rr2 = await client.read_input_registers(0, count=1, device_id=1)
+                second = rr2.registers[0]
+                assert second > first >= 5
+            finally:
+                client.close()
+    assert len(temp_mod.tick_values) >= 2
 
 
 @pytest.mark.asyncio
@@ -298,11 +202,7 @@ async def test_strict_defs_ignores_extra_dataset(tmp_path):
     dataset = {"input": {"9999": 123}, "holding": {}}
     dataset_path = tmp_path / "ds.json"
     dataset_path.write_text(json.dumps(dataset))
-    s = socket.socket()
-    s.bind(("127.0.0.1", 0))
-    port = s.getsockname()[1]
-    s.close()
-    async with start_simulator(port, dataset=str(dataset_path), strict_defs=True) as (
+    async with start_simulator(0, dataset=str(dataset_path), strict_defs=True) as (
         host,
         real_port,
     ):
@@ -342,7 +242,6 @@ async def test_strict_defs_ignores_extra_dataset_serial(tmp_path):
             )
             try:
                 await client.connect()
-                await asyncio.sleep(0.1)
                 rr = await client.read_input_registers(9999, count=1, device_id=1)
                 if not rr.isError():
                     assert rr.registers[0] == 0
@@ -1,6 +1,5 @@
 """Test Modbus simulator register reads."""
 
-import asyncio
 import json
 import importlib.resources as resources
 
@@ -20,14 +19,6 @@ UNIT_ID = 1
 
 @pytest.mark.asyncio
 async def test_simulator_register_reads():
-    import socket
-
-    # Find free port
-    s = socket.socket()
-    s.bind(("127.0.0.1", 0))
-    port = s.getsockname()[1]
-    s.close()
-
     # Load expected values from dataset
     with DATASET_PATH.open("r", encoding="utf-8") as f:
         dataset = json.load(f)
@@ -41,9 +32,10 @@ async def test_simulator_register_reads():
         (3232, 3374),  # remaining TL-XH block / reserved
     ]
 
-    async with start_simulator(
-        port=port, debug_wire=True, force_deterministic=True
-    ) as (host, real_port):
+    async with start_simulator(port=0, debug_wire=True, force_deterministic=True) as (
+        host,
+        real_port,
+    ):
         client = AsyncModbusTcpClient(
             host,
             port=real_port,
@@ -51,7 +43,6 @@ async def test_simulator_register_reads():
             reconnect_delay=0,
         )
         await client.connect()
-        await asyncio.sleep(0.05)
         try:
             # First: test every register individually
             for start, end in ranges:
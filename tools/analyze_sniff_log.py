@@ -21,24 +21,66 @@ What it reports:
 
 You can also pipe the live sniff feed into this tool:
   nc <host> 5700 | python tools/analyze_sniff_log.py -
+
+If the optional `orjson` package is installed it is used to parse lines, which
+is noticeably faster on large logs; otherwise the stdlib json module is used.
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import queue
 import sys
+import threading
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
 
 ISO_FMT = "%Y-%m-%dT%H:%M:%S.%f"
 ISO_ALT = "%Y-%m-%dT%H:%M:%S"
 
 
 def parse_ts(s: str) -> datetime:
-    # Accept "YYYY-mm-ddTHH:MM:SS(.mmm)" (millis precision) or seconds-only
+    # Accept "YYYY-mm-ddTHH:MM:SS(.mmm)" (millis precision) or seconds-only.
+    # Fast path: the broker's own layout is sliced into ints directly, which
+    # is several times cheaper than strptime; anything else falls through.
+    if len(s) >= 19 and s.isascii() and s[10] == "T":
+        tail = s[19:]
+        if not tail:
+            micros = 0
+        elif tail[0] == "." and tail[1:].isdigit():
+            micros = int((tail[1:] + "000000")[:6])
+        else:
+            micros = -1
+        date, time_ = s[0:10], s[11:19]
+        if (
+            micros >= 0
+            and date[4] == "-" == date[7]
+            and time_[2] == ":" == time_[5]
+            and (date[0:4] + date[5:7] + date[8:10]).isdigit()
+            and (time_[0:2] + time_[3:5] + time_[6:8]).isdigit()
+        ):
+            try:
+                return datetime(
+                    int(date[0:4]),
+                    int(date[5:7]),
+                    int(date[8:10]),
+                    int(time_[0:2]),
+                    int(time_[3:5]),
+                    int(time_[6:8]),
+                    micros,
+                    timezone.utc,
+                )
+            except ValueError:
+                pass
     try:
         # handle "2025-09-21T12:34:56.789"
         if "." not in s:
@@ -55,66 +97,71 @@ def parse_ts(s: str) -> datetime:
         return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
 
 
-@dataclass
-class Event:
-    ts: datetime
-    raw: Dict[str, Any]
-
-    @property
-    def role(self) -> Optional[str]:
-        return self.raw.get("role")
-
-    @property
-    def event(self) -> Optional[str]:
-        return self.raw.get("event")
+def _opt_int(v: Any) -> Optional[int]:
+    try:
+        return int(v) if v is not None else None
+    except Exception:
+        return None
 
-    @property
-    def client_from(self) -> Optional[str]:
-        return self.raw.get("from_client")
 
-    @property
-    def client_to(self) -> Optional[str]:
-        return self.raw.get("to_client")
+class Event:
+    """One log record, with the fields ``analyze`` reads decoded once.
 
-    @property
-    def func(self) -> Optional[int]:
-        v = self.raw.get("func")
-        try:
-            return int(v) if v is not None else None
-        except Exception:
-            return None
+    ``ts`` may be passed as None to parse the record's ``ts`` string on first
+    access; outside a --since/--until window it is only needed for the
+    handful of events that get reported.
+    """
 
-    @property
-    def uid(self) -> Optional[int]:
-        v = self.raw.get("uid")
-        try:
-            return int(v) if v is not None else None
-        except Exception:
-            return None
+    __slots__ = (
+        "_ts",
+        "raw",
+        "role",
+        "event",
+        "client_from",
+        "client_to",
+        "func",
+        "uid",
+        "hex",
+        "crc_ok",
+        "body_len",
+        "total_len",
+        "_data",
+    )
 
-    @property
-    def hex(self) -> str:
-        return self.raw.get("hex", "")
+    def __init__(self, ts: Optional[datetime], raw: Dict[str, Any]) -> None:
+        get = raw.get
+        self._ts = ts
+        self.raw = raw
+        self.role: Optional[str] = get("role")
+        self.event: Optional[str] = get("event")
+        self.client_from: Optional[str] = get("from_client")
+        self.client_to: Optional[str] = get("to_client")
+        self.func = _opt_int(get("func"))
+        self.uid = _opt_int(get("uid"))
+        hex_ = get("hex", "")
+        self.hex: str = hex_ if isinstance(hex_, str) else ""
+        crc_ok = get("crc_ok")
+        self.crc_ok: Optional[bool] = crc_ok if isinstance(crc_ok, bool) else None
+        self.body_len = _opt_int(get("len"))
+        # Includes address+func+CRC if hex present
+        self.total_len = len(self.hex) // 2
+        self._data: Optional[bytes] = None
 
     @property
-    def crc_ok(self) -> Optional[bool]:
-        v = self.raw.get("crc_ok")
-        if isinstance(v, bool):
-            return v
-        return None
+    def ts(self) -> datetime:
+        ts = self._ts
+        if ts is None:
+            ts = self._ts = parse_ts(self.raw["ts"])
+        return ts
 
-    @property
-    def body_len(self) -> Optional[int]:
-        v = self.raw.get("len")
-        try:
-            return int(v) if v is not None else None
-        except Exception:
-            return None
+    def data(self) -> bytes:
+        """Frame bytes, decoded from ``hex`` on first use."""
+        if self._data is None:
+            self._data = bytes.fromhex(self.hex)
+        return self._data
 
-    @property
-    def total_len(self) -> int:
-        # Includes address+func+CRC if hex present
-        return len(self.hex) // 2
+    def __repr__(self) -> str:
+        return f"Event(ts={self.ts!r}, raw={self.raw!r})"
 
 
 @dataclass
@@ -128,18 +175,62 @@ class ClientStats:
     unknown_func: int = 0
     large_frames: int = 0
 
-    # For sequences
-    last_req_ts: Optional[datetime] = None
+    # For sequences; the Event rather than its ts, which parses on demand
+    last_req: Optional[Event] = None
     timeout_streak: int = 0
 
 
 KNOWN_FUNCS = {0x03, 0x04, 0x06, 0x10}
+SERIAL_ERROR_EVENTS = frozenset({"shine_serial_error", "shine_open_failed"})
+
+# Suspect events listed in the report
+MAX_SUSPECTS = 500
 
 
 def is_suspect_large(ev: Event, threshold: int = 256) -> bool:
     return ev.total_len >= threshold
 
 
+def _build_crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
+        table.append(crc)
+    return table
+
+
+# Byte-at-a-time lookup table for CRC-16/MODBUS (poly 0xA001 reflected)
+CRC16_TABLE = tuple(_build_crc_table())
+
+
+def modbus_crc(buf: bytes) -> int:
+    crc = 0xFFFF
+    table = CRC16_TABLE
+    for b in buf:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def _rsp_frame_len(data: bytes, off: int) -> Optional[int]:
+    """Length of the RTU response starting at ``off``, from its function code.
+
+    Returns None when the function code doesn't determine the length.
+    """
+    n = len(data)
+    if off + 2 > n:
+        return None
+    func = data[off + 1]
+    if func & 0x80:
+        return 5  # addr, func|0x80, exception code, CRC
+    if func in (0x03, 0x04, 0x17):
+        return 5 + data[off + 2] if off + 3 <= n else None
+    if func in (0x06, 0x10):
+        return 8
+    return None
+
+
 def scan_combined_frames(data: bytes, *, stop_after: int = 2) -> int:
     """Heuristic: count valid RTU subframes within a single blob.
     Looks for [..payload..][crc_lo][crc_hi] boundaries that validate.
@@ -149,74 +240,248 @@ def scan_combined_frames(data: bytes, *, stop_after: int = 2) -> int:
     if n < 4:
         return 0
 
-    def modbus_crc(buf: bytes) -> int:
-        crc = 0xFFFF
-        for b in buf:
-            crc ^= b
-            for _ in range(8):
-                crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
-        return crc & 0xFFFF
-
+    # Fast path: the function code gives each response's length, so walk
+    # back-to-back frames checking one CRC per frame.
     count = 0
-    # Minimum RTU frame is 4 bytes
-    for end in range(4, n + 1):
-        body = data[: end - 2]
-        crc_bytes = data[end - 2 : end]
-        if modbus_crc(body) == int.from_bytes(crc_bytes, "little"):
+    off = 0
+    while off + 4 <= n:
+        size = _rsp_frame_len(data, off)
+        if size is None or off + size > n:
+            break
+        end = off + size
+        if modbus_crc(data[off : end - 2]) != data[end - 2] | (data[end - 1] << 8):
+            break
+        count += 1
+        if count >= stop_after:
+            return count
+        off = end
+    if count:
+        return count
+
+    # Fallback when the first frame doesn't parse: brute search for prefixes
+    # with a valid CRC.
+    table = CRC16_TABLE
+    # Running CRC of data[:end - 2], advanced one byte per candidate boundary
+    # instead of rehashing every prefix. Minimum RTU frame is 4 bytes. The
+    # candidate CRC bytes (lo, hi) = data[end - 2], data[end - 1] come from
+    # two offset views zipped together, so the loop does no index arithmetic.
+    crc = modbus_crc(data[:2])
+    for lo, hi in zip(data[2:], data[3:]):
+        if crc == lo | (hi << 8):
             count += 1
             if count >= stop_after:
                 break
+        crc = (crc >> 8) ^ table[(crc ^ lo) & 0xFF]
     return count
 
 
+# orjson parses the raw bytes of a line directly; stdlib json accepts bytes too
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _load_line(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        obj = _loads(line)
+    except Exception:
+        # Fall back to the lenient path: stdlib json on text with undecodable
+        # bytes replaced, as reading in text mode with errors="replace" did.
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            obj = json.loads(line)
+        except Exception:
+            return None
+    return obj if isinstance(obj, dict) else None
+
+
+READ_CHUNK = 1 << 20
+# Chunks the read-ahead thread may buffer beyond the one being parsed
+READ_AHEAD = 4
+
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Yield the lines spread over byte chunks, without trailing newlines."""
+    tail = b""
+    for chunk in chunks:
+        lines = chunk.split(b"\n")
+        lines[0] = tail + lines[0]
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def iter_lines(fh, chunk_size: int = READ_CHUNK) -> Iterator[bytes]:
+    """Yield the lines of a binary stream, reading it in large chunks.
+
+    Uses ``read1`` where available so a live pipe (``nc ... |``) yields
+    whatever has arrived instead of blocking until a full chunk is buffered.
+    Lines are yielded without their trailing newline.
+    """
+    read = getattr(fh, "read1", fh.read)
+    return split_lines(iter(lambda: read(chunk_size), b""))
+
+
+def read_ahead(
+    paths: List[str], chunk_size: int = READ_CHUNK, depth: int = READ_AHEAD
+) -> Iterator[Iterator[bytes]]:
+    """Yield an iterator over each file's chunks, in order.
+
+    A helper thread reads the files into a bounded queue, so disk reads of
+    the next chunk (or the next file) overlap with parsing the current one.
+    Each chunk iterator must be exhausted before the next is taken. Errors
+    opening or reading a file are re-raised from its chunk iterator.
+    Closing the generator early stops the thread.
+    """
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader() -> None:
+        try:
+            for p in paths:
+                with Path(p).open("rb", buffering=0) as fh:
+                    while True:
+                        chunk = fh.read(chunk_size)
+                        # An empty chunk marks the end of this file
+                        if not put(chunk) or not chunk:
+                            break
+                if stop.is_set():
+                    return
+        except Exception as exc:
+            put(exc)
+
+    def chunks() -> Iterator[bytes]:
+        while True:
+            item = q.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                return
+            yield item
+
+    t = threading.Thread(target=reader, name="read-ahead", daemon=True)
+    t.start()
+    try:
+        for _ in paths:
+            yield chunks()
+    finally:
+        stop.set()
+
+
+def _minute_key(ts: Optional[datetime]) -> Optional[bytes]:
+    if ts is None:
+        return None
+    return ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M").encode()
+
+
+def _line_minute(line: bytes) -> Optional[bytes]:
+    """``YYYY-mm-ddTHH:MM`` of a line's naive (UTC) ``ts`` value, unparsed.
+
+    Returns None whenever the value can't be compared safely as text
+    (missing, unusual layout, or carrying a UTC offset).
+    """
+    i = line.find(b'"ts":')
+    if i < 0:
+        return None
+    j = line.find(b'"', i + 5)
+    k = line.find(b'"', j + 1)
+    if j < 0 or k < 0 or line[i + 5 : j].strip():
+        return None
+    value = line[j + 1 : k]
+    if len(value) < 16 or value[10:11] != b"T" or b"Z" in value:
+        return None
+    rest = value[16:]
+    if b"+" in rest or b"-" in rest:
+        return None
+    return value[:16]
+
+
 def read_events(
     paths: List[str],
     *,
     since: Optional[datetime] = None,
     until: Optional[datetime] = None,
     limit_lines: Optional[int] = None,
+    client: Optional[str] = None,
 ) -> Iterable[Event]:
+    """Yield events from JSONL files (or stdin for ``-``) within the window.
+
+    Lines are prefiltered on their raw bytes before JSON parsing: ISO
+    timestamps sort as text, so a line whose minute lies outside
+    ``since``/``until`` is skipped unparsed, and with ``client`` set a line
+    that doesn't contain that label as a JSON string is skipped too. The
+    client prefilter is only a hint; callers still compare the parsed
+    fields.
+    """
     if not paths:
         yield from ()
         return
 
-    def _yield(obj: Dict[str, Any]):
-        ts_str = obj.get("ts")
-        if ts_str is None:
-            ts = datetime.now(timezone.utc)
-        else:
-            ts = parse_ts(ts_str)
-        if since and ts < since:
+    since_min = _minute_key(since)
+    until_min = _minute_key(until)
+    needle = None
+    if client and client.isascii() and client.isprintable():
+        if '"' not in client and "\\" not in client:
+            needle = b'"' + client.encode() + b'"'
+
+    def _skip(line: bytes) -> bool:
+        if needle is not None and needle not in line:
+            return True
+        if since_min is None and until_min is None:
+            return False
+        minute = _line_minute(line)
+        if minute is None:
+            return False
+        if since_min is not None and minute < since_min:
+            return True
+        return until_min is not None and minute > until_min
+
+    prefilter = needle is not None or since_min is not None or until_min is not None
+
+    def _sources() -> Iterator[Iterable[bytes]]:
+        if len(paths) == 1 and paths[0] in ("-", "/dev/stdin"):
+            stdin = getattr(sys.stdin, "buffer", None)
+            yield iter_lines(stdin) if stdin is not None else sys.stdin
             return
-        if until and ts > until:
-            return
-        yield Event(ts=ts, raw=obj)
+        for chunks in read_ahead(paths):
+            yield split_lines(chunks)
 
+    # Window checks and Event construction stay inline in this one loop
+    # rather than going through a nested generator per line.
+    now = datetime.now
+    windowed = since is not None or until is not None
     yielded = 0
-    if len(paths) == 1 and paths[0] in ("-", "/dev/stdin"):
-        for line in sys.stdin:
-            try:
-                obj = json.loads(line)
-            except Exception:
+    for lines in _sources():
+        for line in lines:
+            if prefilter and isinstance(line, bytes) and _skip(line):
                 continue
-            for ev in _yield(obj):
-                yield ev
-                yielded += 1
-                if limit_lines and yielded >= limit_lines:
-                    return
-        return
-    for p in paths:
-        with Path(p).open("r", encoding="utf-8", errors="replace") as fh:
-            for line in fh:
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
-                for ev in _yield(obj):
-                    yield ev
-                    yielded += 1
-                    if limit_lines and yielded >= limit_lines:
-                        return
+            obj = _load_line(line)
+            if obj is None:
+                continue
+            ts_str = obj.get("ts")
+            if ts_str is None:
+                ts = now(timezone.utc)
+            elif windowed:
+                ts = parse_ts(ts_str)
+            else:
+                ts = None  # parsed by Event.ts if ever needed
+            if since and ts < since:
+                continue
+            if until and ts > until:
+                continue
+            yield Event(ts, obj)
+            yielded += 1
+            if limit_lines and yielded >= limit_lines:
+                return
 
 
 def analyze(
@@ -229,86 +494,127 @@ def analyze(
     until: Optional[datetime] = None,
     limit_lines: Optional[int] = None,
 ) -> None:
-    stats: Dict[str, ClientStats] = {}
-    suspects: List[str] = []
-
-    def get_stats(name: str) -> ClientStats:
-        if name not in stats:
-            stats[name] = ClientStats()
-        return stats[name]
-
-    for ev in read_events(paths, since=since, until=until, limit_lines=limit_lines):
+    stats: Dict[str, ClientStats] = defaultdict(ClientStats)
+    # Only the first MAX_SUSPECTS are reported, so stop collecting there and
+    # keep them as (format, event, args) until printing. Every format starts
+    # with the event's timestamp, which is only parsed then.
+    suspects: List[tuple] = []
+
+    def suspect(fmt: str, ev: Event, *args: Any) -> None:
+        if len(suspects) < MAX_SUSPECTS:
+            suspects.append((fmt, ev, args))
+
+    # Prefiltering by client would change what --limit-lines counts, and
+    # "(unknown)" is a label we synthesise rather than one in the log.
+    client_hint = client_filter
+    if limit_lines or client_filter == "(unknown)":
+        client_hint = None
+    for ev in read_events(
+        paths,
+        since=since,
+        until=until,
+        limit_lines=limit_lines,
+        client=client_hint,
+    ):
         # Determine client label for accounting
         client = ev.client_from or ev.client_to or "(unknown)"
         if client_filter and client != client_filter:
             continue
-        cs = get_stats(client)
+        cs = stats[client]
+        role = ev.role
+        event = ev.event
 
         # Role accounting
-        if ev.role == "REQ":
+        if role == "REQ":
             cs.req += 1
-            cs.last_req_ts = ev.ts
+            cs.last_req = ev
             # Heuristics: uncommon function or very large frame
             if ev.func is not None and ev.func not in KNOWN_FUNCS:
                 cs.unknown_func += 1
-                suspects.append(
-                    f"{ev.ts} {client} REQ unknown func={ev.func} len={ev.total_len}"
+                suspect(
+                    "%s %s REQ unknown func=%s len=%s",
+                    ev,
+                    client,
+                    ev.func,
+                    ev.total_len,
                 )
             if is_suspect_large(ev):
                 cs.large_frames += 1
-                suspects.append(
-                    f"{ev.ts} {client} REQ large frame {ev.total_len}B func={ev.func}"
+                suspect(
+                    "%s %s REQ large frame %sB func=%s",
+                    ev,
+                    client,
+                    ev.total_len,
+                    ev.func,
                 )
-        elif ev.role == "RSP":
+        elif role == "RSP":
             cs.rsp += 1
             # Bad CRC on a response
             if ev.crc_ok is False:
                 cs.crc_bad += 1
-                suspects.append(f"{ev.ts} {client} RSP bad CRC len={ev.total_len}")
+                suspect("%s %s RSP bad CRC len=%s", ev, client, ev.total_len)
             if is_suspect_large(ev):
                 cs.large_frames += 1
-                suspects.append(
-                    f"{ev.ts} {client} RSP large frame {ev.total_len}B func={ev.func}"
+                suspect(
+                    "%s %s RSP large frame %sB func=%s",
+                    ev,
+                    client,
+                    ev.total_len,
+                    ev.func,
                 )
-            if detect_combined and ev.total_len >= combined_threshold:
+            # The scan only ever produces suspect lines; skip it once full
+            if (
+                detect_combined
+                and len(suspects) < MAX_SUSPECTS
+                and ev.total_len >= combined_threshold
+            ):
                 try:
-                    data = bytes.fromhex(ev.hex)
-                    sub = scan_combined_frames(data, stop_after=2)
+                    sub = scan_combined_frames(ev.data(), stop_after=2)
                     if sub > 1:
-                        suspects.append(
-                            f"{ev.ts} {client} RSP contains {sub} valid subframes (possible mis-framing)"
+                        suspect(
+                            "%s %s RSP contains %s valid subframes"
+                            " (possible mis-framing)",
+                            ev,
+                            client,
+                            sub,
                         )
                 except Exception:
                     pass
         # Event accounting
-        if ev.event == "downstream_timeout":
+        if event == "downstream_timeout":
             cs.timeouts += 1
             cs.timeout_streak += 1
-            suspects.append(f"{ev.ts} {client} TIMEOUT ({ev.raw.get('timeout')})")
+            suspect("%s %s TIMEOUT (%s)", ev, client, ev.raw.get("timeout"))
         else:
             cs.timeout_streak = 0
-        if ev.role == "DROP":
+        if role == "DROP":
             cs.drops += 1
-            suspects.append(
-                f"{ev.ts} {client} DROP reason={ev.raw.get('reason')} len={ev.total_len}"
+            suspect(
+                "%s %s DROP reason=%s len=%s",
+                ev,
+                client,
+                ev.raw.get("reason"),
+                ev.total_len,
             )
-        if ev.event in {"shine_serial_error", "shine_open_failed"}:
+        if event in SERIAL_ERROR_EVENTS:
             cs.serial_errors += 1
-            suspects.append(f"{ev.ts} {client} {ev.event} error={ev.raw.get('error')}")
+            suspect("%s %s %s error=%s", ev, client, event, ev.raw.get("error"))
 
-    # Output summary
-    print("=== Summary by client ===")
+    # Build the whole report and write it once rather than a print per line
+    out = ["=== Summary by client ==="]
     for client, cs in sorted(stats.items()):
-        print(
+        out.append(
             f"{client:>20}  REQ={cs.req:6d} RSP={cs.rsp:6d} timeouts={cs.timeouts:5d} "
             f"drops={cs.drops:5d} crc_bad={cs.crc_bad:4d} unk_func={cs.unknown_func:3d} large={cs.large_frames:3d}"
         )
-    print()
+    out.append("")
 
     # Top suspects
-    print("=== Suspect events ===")
-    for line in suspects[:500]:
-        print(line)
+    out.append("=== Suspect events ===")
+    out.extend(fmt % (ev.ts, *args) for fmt, ev, args in suspects)
+    out.append("")
+    sys.stdout.write("\n".join(out))
+    sys.stdout.flush()
 
 
 def _parse_optional_ts(s: Optional[str]) -> Optional[datetime]:
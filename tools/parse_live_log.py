@@ -10,20 +10,52 @@ from __future__ import annotations
 
 import argparse
 import json
-from collections import Counter, defaultdict
+import struct
+import sys
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache, partial
+from heapq import nsmallest
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Sequence
 
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
 
-def modbus_crc(data: bytes) -> int:
+
+def _crc16_entry(b: int) -> int:
+    crc = b
+    for _ in range(8):
+        crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
+    return crc
+
+
+# CRC-16/MODBUS (reflected poly 0xA001): one lookup per byte instead of 8 shifts
+_CRC16_TABLE = tuple(_crc16_entry(b) for b in range(256))
+
+
+def _modbus_crc_table(data: bytes) -> int:
+    table = _CRC16_TABLE
     crc = 0xFFFF
     for b in data:
-        crc ^= b
-        for _ in range(8):
-            crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
-    return crc & 0xFFFF
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+# Same accelerator as the broker: crcmod's C extension when installed
+# (pip install .[fast]); its pure-Python fallback is slower than the table.
+try:
+    from crcmod import _crcfunext  # noqa: F401
+    from crcmod.predefined import mkPredefinedCrcFun
+except ImportError:  # optional accelerator
+    modbus_crc = _modbus_crc_table
+else:
+    modbus_crc = mkPredefinedCrcFun("modbus")
 
 
 def crc_ok(frame: bytes) -> bool:
@@ -32,38 +64,139 @@ def crc_ok(frame: bytes) -> bool:
     return modbus_crc(frame[:-2]) == int.from_bytes(frame[-2:], "little")
 
 
-def scan_combined(hexs: str, max_frame: int = 512) -> int:
+def scan_combined(
+    hexs: str,
+    max_frame: int = 512,
+    early_exit_at: int | None = None,
+    valid_addrs: frozenset[int] | None = None,
+) -> int:
+    """Count back-to-back CRC-valid frames in a hex blob.
+
+    With ``early_exit_at`` set, stop as soon as that many have been found.
+    With ``valid_addrs`` set, only offsets holding one of those slave
+    addresses are tried as frame starts.
+    """
     try:
         data = bytes.fromhex(hexs)
     except Exception:
         return 0
+    if _scan_combined_kernel is not None:
+        return int(
+            _scan_combined_kernel(
+                np.frombuffer(data, dtype=np.uint8),
+                _CRC16_TABLE_NP,
+                _start_mask(valid_addrs),
+                max_frame,
+                early_exit_at is not None,
+                early_exit_at or 0,
+            )
+        )
+    table = _CRC16_TABLE
     count = 0
     i = 0
     L = len(data)
     while i + 4 <= L:
+        if valid_addrs is not None and data[i] not in valid_addrs:
+            i += 1
+            continue
         found = False
         max_j = min(L, i + max_frame)
-        for j in range(i + 4, max_j + 1):
-            if crc_ok(data[i:j]):
+        # Running CRC of data[i:j - 2] for candidate frames data[i:j], advanced
+        # one byte per j instead of recomputing each window from scratch. The
+        # trailer bytes (lo, hi) = data[j - 2], data[j - 1] come from two
+        # offset slices zipped together.
+        crc = _modbus_crc_table(data[i : i + 2])
+        j = i + 4
+        for lo, hi in zip(data[i + 2 : max_j - 1], data[i + 3 : max_j]):
+            if crc == lo | (hi << 8):
                 count += 1
+                if early_exit_at is not None and count >= early_exit_at:
+                    return count
                 i = j
                 found = True
                 break
+            crc = (crc >> 8) ^ table[(crc ^ lo) & 0xFF]
+            j += 1
         if not found:
             i += 1
     return count
 
 
-@dataclass
+# Optional compiled kernel for scan_combined: the same loop as above, run by
+# numba over a uint8 view (pip install numba). Compiled once and cached.
+try:
+    import numba
+    import numpy as np
+except ImportError:  # optional accelerator
+    _scan_combined_kernel = None
+else:
+    _CRC16_TABLE_NP = np.array(_CRC16_TABLE, dtype=np.int64)
+
+    @lru_cache(maxsize=None)
+    def _start_mask(valid_addrs: frozenset[int] | None):
+        if valid_addrs is None:
+            return np.ones(256, dtype=np.bool_)
+        mask = np.zeros(256, dtype=np.bool_)
+        mask[[addr for addr in valid_addrs if 0 <= addr <= 255]] = True
+        return mask
+
+    @numba.njit(cache=True)
+    def _scan_combined_kernel(
+        data, table, start_mask, max_frame, has_early_exit, early_exit_at
+    ):
+        count = 0
+        i = 0
+        L = data.shape[0]
+        while i + 4 <= L:
+            if not start_mask[data[i]]:
+                i += 1
+                continue
+            found = False
+            max_j = min(L, i + max_frame)
+            crc = 0xFFFF
+            crc = (crc >> 8) ^ table[(crc ^ data[i]) & 0xFF]
+            crc = (crc >> 8) ^ table[(crc ^ data[i + 1]) & 0xFF]
+            # k is the first trailer byte of candidate frame data[i:k + 2]
+            k = i + 2
+            while k + 1 < max_j:
+                if crc == (np.int64(data[k]) | (np.int64(data[k + 1]) << 8)):
+                    count += 1
+                    if has_early_exit and count >= early_exit_at:
+                        return count
+                    i = k + 2
+                    found = True
+                    break
+                crc = (crc >> 8) ^ table[(crc ^ data[k]) & 0xFF]
+                k += 1
+            if not found:
+                i += 1
+        return count
+
+
+# Buffered response rows per read window before folding them into stats
+REGISTER_FLUSH_ROWS = 1024
+# Unanswered requests remembered per function code for REQ/RSP pairing
+REQ_BACKLOG = 64
+# Distinct values kept per register; once full the report shows "N+"
+UNIQUE_VALUES_CAP = 4096
+
+
 class RegisterStats:
-    count: int = 0
-    min_value: int | None = None
-    max_value: int | None = None
-    unique_values: set[int] = None
+    """Per-register aggregates; one is kept for every register observed."""
 
-    def __post_init__(self) -> None:
-        if self.unique_values is None:
-            self.unique_values = set()
+    # Slots rather than a dataclass __dict__: a log touches thousands of these
+    __slots__ = ("count", "min_value", "max_value", "unique_values", "unique_saturated")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.min_value: int | None = None
+        self.max_value: int | None = None
+        self.unique_values: set[int] = set()
+        self.unique_saturated = False
+
+    def unique_display(self) -> str:
+        suffix = "+" if self.unique_saturated else ""
+        return f"{len(self.unique_values)}{suffix}"
 
     def record(self, value: int) -> None:
         self.count += 1
@@ -71,107 +204,269 @@ class RegisterStats:
             self.min_value = value
         if self.max_value is None or value > self.max_value:
             self.max_value = value
-        self.unique_values.add(value)
+        if not self.unique_saturated:
+            self._add_unique((value,))
+
+    def record_column(self, values: Sequence[int]) -> None:
+        self.count += len(values)
+        low = min(values)
+        high = max(values)
+        if self.min_value is None or low < self.min_value:
+            self.min_value = low
+        if self.max_value is None or high > self.max_value:
+            self.max_value = high
+        if not self.unique_saturated:
+            self._add_unique(values)
+
+    def merge(self, other: RegisterStats) -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        if self.min_value is None or other.min_value < self.min_value:
+            self.min_value = other.min_value
+        if self.max_value is None or other.max_value > self.max_value:
+            self.max_value = other.max_value
+        if not self.unique_saturated:
+            self._add_unique(other.unique_values)
+        self.unique_saturated |= other.unique_saturated
+
+    def _add_unique(self, values: Iterable[int]) -> None:
+        """Add ``values`` to the distinct set without growing it past the cap.
+
+        Once a new value no longer fits, the set is frozen and the report
+        shows its size as a lower bound.
+        """
+        uniques = self.unique_values
+        if len(uniques) + len(values) <= UNIQUE_VALUES_CAP:
+            uniques.update(values)
+            return
+        for value in values:
+            if value not in uniques:
+                if len(uniques) >= UNIQUE_VALUES_CAP:
+                    self.unique_saturated = True
+                    return
+                uniques.add(value)
+
+
+def flush_register_rows(
+    register_stats: dict[int, RegisterStats], addr: int, rows: list[list[int]]
+) -> None:
+    """Fold buffered register rows of one read window into ``register_stats``.
 
+    Transposing with ``zip`` lets each register take a whole column through
+    the builtin min/max/set.update instead of one Python call per value.
+    """
+    for reg_index, column in enumerate(zip(*rows), addr):
+        register_stats[reg_index].record_column(column)
+    rows.clear()
 
-def decode_registers_from_pdu_hex(pdu_hex: str) -> list[int]:
+
+# Polling repeats the same frames (unchanged setting/status blocks), so the
+# per-hex results below are memoized.
+HEX_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=HEX_CACHE_SIZE)
+def _decode_register_tuple(pdu_hex: str) -> tuple[int, ...]:
     try:
         raw = bytes.fromhex(pdu_hex)
     except Exception:
-        return []
+        return ()
     if len(raw) < 3:
-        return []
+        return ()
     bytecount = raw[1]
-    data = raw[2 : 2 + bytecount]
-    if len(data) % 2:
-        return []
-    regs: list[int] = []
-    for i in range(0, len(data), 2):
-        regs.append((data[i] << 8) | data[i + 1])
-    return regs
+    size = min(bytecount, len(raw) - 2)
+    if size % 2:
+        return ()
+    return struct.unpack_from(f">{size // 2}H", raw, 2)
+
+
+def decode_register_values(pdu_hex: str) -> tuple[int, ...]:
+    """Cached, read-only variant of ``decode_registers_from_pdu_hex``."""
+    try:
+        return _decode_register_tuple(pdu_hex)
+    except TypeError:  # unhashable, so not a hex string either
+        return ()
+
+
+def decode_registers_from_pdu_hex(pdu_hex: str) -> list[int]:
+    return list(decode_register_values(pdu_hex))
+
+
+@lru_cache(maxsize=HEX_CACHE_SIZE)
+def _has_combined_frames(hexs: str, valid_addrs: frozenset[int] | None) -> bool:
+    return scan_combined(hexs, early_exit_at=2, valid_addrs=valid_addrs) >= 2
+
+
+# orjson parses the raw bytes of a line directly; stdlib json accepts bytes too
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def load_line(line: bytes):
+    """Parse one JSONL line read in binary mode.
+
+    Raises ``json.JSONDecodeError`` for lines that aren't JSON (including
+    blank ones). Undecodable bytes are dropped, as the text-mode reader did.
+    """
+    try:
+        return _loads(line)
+    except ValueError:
+        return _load_lossy(line)
+
+
+def _load_lossy(line: bytes):
+    return json.loads(line.decode("utf-8", errors="ignore"))
 
 
 def iter_records(path: Path) -> Iterable[dict]:
-    with path.open("r", encoding="utf-8", errors="ignore") as fh:
-        for line_no, line in enumerate(fh, start=1):
-            s = line.strip()
-            if not s:
-                continue
+    with path.open("rb") as fh:
+        yield from _parse_records(fh)
+
+
+def _parse_records(lines: Iterable[bytes]) -> Iterable[dict]:
+    # load_line inlined: the parser is bound once and the lossy retry only
+    # runs for lines the fast path rejects
+    loads = _loads
+    for line_no, line in enumerate(lines, start=1):
+        try:
+            obj = loads(line)
+        except ValueError:
             try:
-                obj = json.loads(s)
+                obj = _load_lossy(line)
             except json.JSONDecodeError:
                 continue
-            obj["_line"] = line_no
-            yield obj
+        obj["_line"] = line_no
+        yield obj
+
+
+def split_ranges(path: Path, parts: int) -> list[tuple[int, int]]:
+    """Cut ``path`` into up to ``parts`` byte ranges that start on a line."""
+    size = path.stat().st_size
+    bounds = [0]
+    with path.open("rb") as fh:
+        for k in range(1, parts):
+            pos = max(size * k // parts, bounds[-1])
+            if pos:
+                # Finish the line that byte pos - 1 belongs to
+                fh.seek(pos - 1)
+                fh.readline()
+                pos = fh.tell()
+            bounds.append(min(pos, size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _range_lines(fh, start: int, end: int) -> Iterable[bytes]:
+    fh.seek(start)
+    pos = start
+    for line in fh:
+        if pos >= end:
+            break
+        pos += len(line)
+        yield line
+
+
+def _first_timestamp(stamps: Iterable) -> datetime | None:
+    for ts in stamps:
+        try:
+            return datetime.fromisoformat(ts)
+        except Exception:
+            continue
+    return None
 
 
-def quick_summary(path: Path, lines: int = 20000) -> None:
+def quick_summary(
+    path: Path, lines: int = 20000, uids: frozenset[int] | None = None
+) -> None:
     by_event: Dict[str, int] = defaultdict(int)
     by_client: Dict[str, int] = defaultdict(int)
     crc_fail = 0
     timeouts = 0
     drops = 0
     combined_suspects = 0
-    first_ts = None
-    last_ts = None
+    stamps: list = []
     total = 0
 
-    with path.open("r", encoding="utf-8", errors="ignore") as fh:
-        for ln, line in enumerate(fh):
-            if ln >= lines:
-                break
-            s = line.strip()
-            if not s:
-                continue
+    with path.open("rb") as fh:
+        for line in islice(fh, max(lines, 0)):
             try:
-                obj = json.loads(s)
+                obj = load_line(line)
             except Exception:
                 continue
             total += 1
-            ts = obj.get("ts")
+            # Each field is looked up once through a bound get
+            get = obj.get
+            ts = get("ts")
             if ts:
-                try:
-                    t = datetime.fromisoformat(ts)
-                    if first_ts is None:
-                        first_ts = t
-                    last_ts = t
-                except Exception:
-                    pass
-            ev = obj.get("event") or obj.get("role") or "UNKNOWN"
-            by_event[ev] += 1
-            client = (
-                obj.get("from_client")
-                or obj.get("to_client")
-                or obj.get("from")
-                or "GLOBAL"
-            )
+                stamps.append(ts)
+            event = get("event")
+            role = get("role")
+            by_event[event or role or "UNKNOWN"] += 1
+            client = get("from_client") or get("to_client") or get("from") or "GLOBAL"
             by_client[client] += 1
-            if obj.get("crc_ok") is False:
+            if get("crc_ok") is False:
                 crc_fail += 1
-            if obj.get("event") == "downstream_timeout":
+            if event == "downstream_timeout":
                 timeouts += 1
-            if obj.get("role") == "DROP" or obj.get("reason") == "bad_crc":
+            if role == "DROP" or get("reason") == "bad_crc":
                 drops += 1
-            hexs = obj.get("hex") or ""
+            hexs = get("hex") or ""
             if hexs:
                 try:
-                    if scan_combined(hexs) > 1:
+                    if _has_combined_frames(hexs, uids):
                         combined_suspects += 1
                 except Exception:
                     pass
 
-    print(f"Scanned: {total} lines (max {lines})")
+    # Only the first and last parseable stamps are shown, so parse from each
+    # end instead of turning every record's ts into a datetime.
+    first_ts = _first_timestamp(stamps)
+    last_ts = _first_timestamp(reversed(stamps))
+
+    # Build the whole report and write it once rather than a print per line
+    out = [f"Scanned: {total} lines (max {lines})"]
     if first_ts and last_ts:
-        print(f"Time range: {first_ts.isoformat()} -> {last_ts.isoformat()}")
-    print("Top events:")
-    for k, v in sorted(by_event.items(), key=lambda x: -x[1])[:20]:
-        print(f"  {k}: {v}")
-    print("Top clients:")
-    for k, v in sorted(by_client.items(), key=lambda x: -x[1])[:10]:
-        print(f"  {k}: {v}")
-    print(
+        out.append(f"Time range: {first_ts.isoformat()} -> {last_ts.isoformat()}")
+    out.append("Top events:")
+    for k, v in nsmallest(20, by_event.items(), key=lambda x: -x[1]):
+        out.append(f"  {k}: {v}")
+    out.append("Top clients:")
+    for k, v in nsmallest(10, by_client.items(), key=lambda x: -x[1]):
+        out.append(f"  {k}: {v}")
+    out.append(
         f"crc_fail: {crc_fail}  timeouts: {timeouts}  drops: {drops}  combined_suspects: {combined_suspects}"
     )
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+@dataclass
+class Summary:
+    """Aggregates of one ``summarise`` pass, mergeable across file ranges."""
+
+    frames_processed: int = 0
+    # Plain dict: Counter's += costs more per frame than dict.get
+    response_summary: dict[tuple, int] = None
+    register_stats: dict[int, RegisterStats] = None
+    register_histories: dict[int, list[tuple[str | None, int, str | None]]] = None
+
+    def __post_init__(self) -> None:
+        if self.response_summary is None:
+            self.response_summary = {}
+        if self.register_stats is None:
+            self.register_stats = defaultdict(RegisterStats)
+        if self.register_histories is None:
+            self.register_histories = {}
+
+    def merge(self, other: Summary) -> None:
+        """Fold in the summary of the range that follows this one."""
+        self.frames_processed += other.frames_processed
+        response_summary = self.response_summary
+        for key, freq in other.response_summary.items():
+            response_summary[key] = response_summary.get(key, 0) + freq
+        for reg, stats in other.register_stats.items():
+            self.register_stats[reg].merge(stats)
+        for reg, hist in other.register_histories.items():
+            self.register_histories.setdefault(reg, []).extend(hist)
 
 
 def summarise(
@@ -185,105 +480,204 @@ def summarise(
     register_history: set[int],
     limit: int | None,
     top: int,
+    jobs: int = 1,
 ) -> None:
-    response_summary: Counter = Counter()
-    register_stats: dict[int, RegisterStats] = defaultdict(RegisterStats)
-    register_histories: dict[int, list[tuple[str | None, int, str | None]]] = {
-        reg: [] for reg in register_history
-    }
+    filters = dict(
+        to_filters=to_filters,
+        from_filters=from_filters,
+        func_filters=func_filters,
+        since=since,
+        until=until,
+    )
+    # --limit and --dump-register depend on file order across the whole log
+    # (first N frames, request/response pairing), so they stay sequential.
+    ranges = split_ranges(logfile, jobs) if jobs > 1 else []
+    if len(ranges) > 1 and not register_history and not limit:
+        worker = partial(_summarise_range, logfile, **filters)
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            parts = list(pool.map(worker, *zip(*ranges)))
+        summary = parts[0]
+        for part in parts[1:]:
+            summary.merge(part)
+    else:
+        summary = aggregate(
+            iter_records(logfile),
+            **filters,
+            register_history=register_history,
+            limit=limit,
+        )
+    print_summary(summary, top)
+
+
+def _summarise_range(logfile: Path, start: int, end: int, **filters) -> Summary:
+    with logfile.open("rb") as fh:
+        return aggregate(
+            _parse_records(_range_lines(fh, start, end)),
+            **filters,
+            register_history=set(),
+            limit=None,
+        )
+
+
+def aggregate(
+    records: Iterable[dict],
+    *,
+    to_filters: set[str] | None,
+    from_filters: set[str] | None,
+    func_filters: set[int] | None,
+    since: datetime | None,
+    until: datetime | None,
+    register_history: set[int],
+    limit: int | None,
+) -> Summary:
+    summary = Summary(register_histories={reg: [] for reg in register_history})
+    response_summary = summary.response_summary
+    register_stats = summary.register_stats
+    register_histories = summary.register_histories
 
     wants_req_link = bool(register_history)
-    req_buffer: dict[int, list[dict]] = defaultdict(list) if wants_req_link else {}
+    # FIFO per function code; unanswered requests (timeouts) would otherwise
+    # pile up forever, so only the most recent REQ_BACKLOG are kept.
+    req_buffer: dict[int, deque[dict]] = (
+        defaultdict(partial(deque, maxlen=REQ_BACKLOG)) if wants_req_link else {}
+    )
+
+    # Decoded rows buffered per (addr, register count) read window
+    pending_rows: dict[tuple[int, int], list[list[int]]] = {}
 
     frames_processed = 0
-    for record in iter_records(logfile):
+    # Every filter just skips the record, so run the cheap dict-lookup ones
+    # first and parse the timestamp only for records that survive them.
+    endpoint_keys = {"REQ": "from_client", "RSP": "to_client"}
+    endpoint_filters = {"REQ": from_filters, "RSP": to_filters}
+    # Bursts share a millisecond stamp; reuse the last parse for repeats.
+    prev_raw_ts = prev_ts = None
+    for record in records:
         role = record.get("role")
+        endpoint_key = endpoint_keys.get(role)
+        if endpoint_key is None:
+            continue
+        endpoint = record.get(endpoint_key)
+        endpoint_filter = endpoint_filters[role]
+        if endpoint_filter and endpoint not in endpoint_filter:
+            continue
         func = record.get("func")
+        if func_filters and func not in func_filters:
+            continue
+
         ts = None
-        if record.get("ts"):
-            try:
-                ts = datetime.fromisoformat(record.get("ts"))
-            except Exception:
-                ts = None
+        if (since or until) and record.get("ts"):
+            raw_ts = record.get("ts")
+            if raw_ts == prev_raw_ts:
+                ts = prev_ts
+            else:
+                try:
+                    ts = datetime.fromisoformat(raw_ts)
+                except Exception:
+                    ts = None
+                prev_raw_ts, prev_ts = raw_ts, ts
         if since and ts and ts < since:
             continue
         if until and ts and ts > until:
             continue
 
         if role == "REQ":
-            endpoint = record.get("from_client")
-            if from_filters and endpoint not in from_filters:
-                continue
-            if func_filters and func not in func_filters:
-                continue
             if wants_req_link and func is not None:
                 req_buffer[func].append(record)
             continue
 
-        if role != "RSP":
-            continue
-
-        endpoint = record.get("to_client")
-        if to_filters and endpoint not in to_filters:
-            continue
-        if func_filters and func not in func_filters:
-            continue
-
         frames_processed += 1
         addr = record.get("addr")
         count = record.get("count")
-        response_summary[(endpoint or "?", func, addr, count)] += 1
+        window_key = (endpoint or "?", func, addr, count)
+        response_summary[window_key] = response_summary.get(window_key, 0) + 1
 
         if func in {3, 4} and addr is not None:
-            regs = decode_registers_from_pdu_hex(record.get("hex", ""))
+            regs = decode_register_values(record.get("hex", ""))
             if wants_req_link:
-                reqs = req_buffer.get(func) or []
-                related_req = reqs.pop(0) if reqs else None
+                reqs = req_buffer.get(func)
+                related_req = reqs.popleft() if reqs else None
                 req_addr = related_req.get("addr") if related_req else None
             else:
                 req_addr = None
 
-            for offset, value in enumerate(regs):
-                reg_index = addr + offset
-                register_stats[reg_index].record(value)
-                if reg_index in register_histories:
+            if regs:
+                window = (addr, len(regs))
+                rows = pending_rows.get(window)
+                if rows is None:
+                    rows = pending_rows[window] = []
+                    # Keep register_stats in first-seen order for the report
+                    for reg_index in range(addr, addr + len(regs)):
+                        register_stats[reg_index]
+                rows.append(regs)
+                if len(rows) >= REGISTER_FLUSH_ROWS:
+                    flush_register_rows(register_stats, addr, rows)
+
+            for reg_index in register_histories:
+                offset = reg_index - addr
+                if 0 <= offset < len(regs):
                     register_histories[reg_index].append(
-                        (record.get("ts"), value, endpoint)
+                        (record.get("ts"), regs[offset], endpoint)
                     )
 
         if limit and frames_processed >= limit:
             break
 
-    print(f"Frames processed: {frames_processed}")
-    if not frames_processed:
-        return
+    for (addr, _), rows in pending_rows.items():
+        if rows:
+            flush_register_rows(register_stats, addr, rows)
+
+    summary.frames_processed = frames_processed
+    return summary
+
+
+def print_summary(summary: Summary, top: int) -> None:
+    # Build the whole report and write it once rather than a print per line
+    out = [f"Frames processed: {summary.frames_processed}"]
+    if summary.frames_processed:
+        _format_tables(out, summary, top)
+    sys.stdout.write("\n".join(out) + "\n")
 
-    print("\nResponse windows (top):")
+
+def _format_tables(out: list[str], summary: Summary, top: int) -> None:
+    response_summary = summary.response_summary
+    register_stats = summary.register_stats
+    register_histories = summary.register_histories
+
+    out.append("\nResponse windows (top):")
     header = f"{'target':<28}{'func':>6}{'addr':>10}{'count':>8}{'frames':>10}"
-    print(header)
-    print("-" * len(header))
-    for target, func, addr, count in sorted(
+    out.append(header)
+    out.append("-" * len(header))
+    # nsmallest(n, it, key) == sorted(it, key=key)[:n], ties included, without
+    # sorting every key just to print the top few
+    for target, func, addr, count in nsmallest(
+        top,
         response_summary,
         key=lambda key: (-response_summary[key], key[0], key[1] or -1, key[2] or -1),
-    )[:top]:
+    ):
         freq = response_summary[(target, func, addr, count)]
         addr_disp = str(addr) if addr is not None else "-"
         count_disp = str(count) if count is not None else "-"
         func_disp = str(func) if func is not None else "-"
-        print(f"{target:<28}{func_disp:>6}{addr_disp:>10}{count_disp:>8}{freq:>10}")
+        out.append(
+            f"{target:<28}{func_disp:>6}{addr_disp:>10}{count_disp:>8}{freq:>10}"
+        )
 
     if register_stats:
-        print("\nRegister coverage (top observed registers):")
-        for reg in sorted(register_stats, key=lambda r: -register_stats[r].count)[:top]:
+        out.append("\nRegister coverage (top observed registers):")
+        for reg in nsmallest(
+            top, register_stats, key=lambda r: -register_stats[r].count
+        ):
             s = register_stats[reg]
-            print(
-                f"  reg {reg}: obs={s.count} min={s.min_value} max={s.max_value} unique={len(s.unique_values)}"
+            out.append(
+                f"  reg {reg}: obs={s.count} min={s.min_value} max={s.max_value} unique={s.unique_display()}"
             )
 
     for reg, hist in register_histories.items():
-        print(f"\nHistory for register {reg} ({len(hist)} samples):")
-        for ts, v, endpoint in hist:
-            print(f"  {ts or '-'}  {endpoint or '-':<28}  {v}")
+        out.append(f"\nHistory for register {reg} ({len(hist)} samples):")
+        out.extend(
+            f"  {ts or '-'}  {endpoint or '-':<28}  {v}" for ts, v, endpoint in hist
+        )
 
 
 def main() -> None:
@@ -291,6 +685,13 @@ def main() -> None:
     ap.add_argument("path", nargs="?", default="broker-210925.log")
     ap.add_argument("--quick", action="store_true", help="Quick summary mode")
     ap.add_argument("--lines", type=int, default=20000, help="Max lines for quick mode")
+    ap.add_argument(
+        "--uids",
+        nargs="*",
+        type=int,
+        help="Slave addresses in use; quick mode only tries combined frames"
+        " starting with one of them",
+    )
     ap.add_argument("--to", nargs="*", help="Only include responses to these endpoints")
     ap.add_argument(
         "--from",
@@ -303,6 +704,13 @@ def main() -> None:
     ap.add_argument("--until", type=str, help="ISO end time filter")
     ap.add_argument("--limit", type=int, help="Stop after this many response frames")
     ap.add_argument("--top", type=int, default=10, help="Rows to show in summaries")
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for the full summary (sequential with --limit"
+        " or --dump-register)",
+    )
     ap.add_argument(
         "--dump-register",
         dest="dump_registers",
@@ -317,7 +725,8 @@ def main() -> None:
         raise SystemExit(f"Log not found: {path}")
 
     if args.quick:
-        quick_summary(path, lines=args.lines)
+        uids = frozenset(args.uids) if args.uids else None
+        quick_summary(path, lines=args.lines, uids=uids)
         return
 
     to_filters = set(args.to) if args.to else None
@@ -337,6 +746,7 @@ def main() -> None:
         register_history=register_history,
         limit=args.limit,
         top=args.top,
+        jobs=args.jobs,
     )
 
 